@@ -0,0 +1,96 @@
+"""
+Access Statistics Buffer for ProfitWi$e Platform
+Aggregates per-user dashboard access counters in memory and flushes them to the store in batches
+"""
+
+import atexit
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from storage import DataStore
+
+logger = logging.getLogger(__name__)
+
+
+class AccessStatsBuffer:
+    """Buffer access_count/last_access updates so dashboard reads never write to disk"""
+
+    def __init__(self, store: DataStore, flush_interval: float = 10.0, max_pending: int = 500):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._pending_hits = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, user_id: Any) -> None:
+        """Count one dashboard access for a user"""
+        with self._lock:
+            entry = self._pending.setdefault(user_id, {'count': 0, 'last_access': None})
+            entry['count'] += 1
+            entry['last_access'] = datetime.now().isoformat()
+            self._pending_hits += 1
+            full = self._pending_hits >= self.max_pending
+
+        if full:
+            # Hand the flush to the background thread rather than the request
+            self._wakeup.set()
+
+    def merge(self, user_id: Any, business: Optional[Dict]) -> Optional[Dict]:
+        """Bring a business record's access counters up to date, including unflushed accesses"""
+        if business is None:
+            return None
+        # Flushes do not invalidate cached records, so read the stored counters directly;
+        # holding the flush lock keeps a concurrent flush from being counted twice or not at all
+        with self._flush_lock:
+            business.update(self.store.get_business_access(user_id))
+            with self._lock:
+                entry = self._pending.get(user_id)
+                if entry:
+                    business['access_count'] = business.get('access_count', 0) + entry['count']
+                    business['last_access'] = entry['last_access']
+        return business
+
+    def flush(self) -> int:
+        """Write all buffered counters to the store and return how many users were updated"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_hits = 0
+            if not pending:
+                return 0
+
+            batch = [(user_id, entry['count'], entry['last_access']) for user_id, entry in pending.items()]
+            try:
+                self.store.record_business_access(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush access stats: {e}")
+                # Put the counts back so they are retried on the next flush
+                with self._lock:
+                    for user_id, entry in pending.items():
+                        current = self._pending.setdefault(user_id, {'count': 0, 'last_access': None})
+                        current['count'] += entry['count']
+                        current['last_access'] = current['last_access'] or entry['last_access']
+                        self._pending_hits += entry['count']
+                return 0
+            return len(batch)
+
+    def start(self) -> None:
+        """Flush on a timer, when the buffer fills, and at interpreter shutdown"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self.flush()
+
+        self._thread = threading.Thread(target=run, name='access-stats-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
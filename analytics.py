@@ -0,0 +1,246 @@
+"""
+Portfolio Analytics for ProfitWi$e Platform
+Vectorized health scores and unit economics across every business using NumPy column arrays
+"""
+
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from parsers import parse_batch
+from storage import DataStore
+
+logger = logging.getLogger(__name__)
+
+# Points per answered onboarding field; mirrors calculate_health_score in app.py
+HEALTH_WEIGHTS = {
+    'monthly_revenue': 10, 'revenue_model': 5, 'revenue_type': 5,
+    'customer_retention': 10, 'revenue_per_customer': 5, 'customer_acquisition_cost': 5,
+    'financial_tools': 10, 'unit_economics': 5, 'waste_tracking': 5,
+    'cost_revenue_opportunities': 10, 'lead_generation': 5, 'upsell_cross_sell': 5
+}
+SOCIAL_FIELDS = ('linkedin_page', 'twitter_handle', 'instagram_account', 'facebook_page')
+DOCUMENT_FIELDS = ('financial_uploads', 'customer_uploads', 'strategic_uploads')
+
+# Numeric onboarding fields and the parser kind each one needs
+NUMERIC_FIELDS = {
+    'monthly_revenue': 'revenue_range',
+    'revenue_per_customer': 'currency',
+    'customer_acquisition_cost': 'currency',
+    'direct_costs': 'currency',
+    'operating_expenses': 'currency',
+    'customer_retention': 'retention_rate'
+}
+
+ONBOARDING_FIELDS = tuple(dict.fromkeys(
+    list(HEALTH_WEIGHTS) + list(SOCIAL_FIELDS) + list(DOCUMENT_FIELDS) + list(NUMERIC_FIELDS) + ['cash_flow']
+))
+
+# LTV horizon; also the lifetime used when full retention would make it unbounded
+MAX_LIFETIME_MONTHS = 60
+
+PERCENTILES = (10, 25, 50, 75, 90)
+HEALTH_BINS = np.arange(0, 101, 10)
+
+UNCATEGORIZED = 'uncategorized'
+
+
+def load_frame(rows: Iterable[Tuple[Any, Optional[str], Dict]]) -> Dict[str, np.ndarray]:
+    """Parse (user_id, category, onboarding_data) rows into one array per column"""
+    user_ids, categories, columns = [], [], {field: [] for field in ONBOARDING_FIELDS}
+    for user_id, category, onboarding_data in rows:
+        user_ids.append(user_id)
+        categories.append(category or UNCATEGORIZED)
+        for field, column in columns.items():
+            column.append(onboarding_data.get(field))
+    count = len(user_ids)
+
+    # Categories are stored once and referenced by code so grouping and filtering stay numeric
+    names, codes = np.unique(np.array(categories, dtype=str), return_inverse=True)
+    frame = {
+        'user_id': np.array(user_ids, dtype=object),
+        'category_names': names,
+        'category_code': codes.reshape(count)
+    }
+    for field, kind in NUMERIC_FIELDS.items():
+        frame[field] = np.array(parse_batch(columns[field], kind), dtype=np.float64)
+
+    # NaN where the retention answer is missing or unreadable
+    frame['monthly_churn'] = np.array(parse_batch(columns['customer_retention'], 'monthly_churn'), dtype=np.float64)
+
+    cash_flow = parse_batch(columns['cash_flow'], 'cash_flow')
+    frame['cash_in'] = np.fromiter((flow['in'] for flow in cash_flow), dtype=np.float64, count=count)
+    frame['cash_out'] = np.fromiter((flow['out'] for flow in cash_flow), dtype=np.float64, count=count)
+
+    # An answered field is a truthy one, as in calculate_health_score
+    for field in list(HEALTH_WEIGHTS) + list(SOCIAL_FIELDS) + list(DOCUMENT_FIELDS):
+        frame[f'has_{field}'] = np.fromiter(map(bool, columns[field]), dtype=bool, count=count)
+    return frame
+
+
+def compute_metrics(frame: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Health score, margin, customers, LTV/CAC, net cash flow and retention for every business"""
+    revenue = frame['monthly_revenue']
+    revenue_per_customer = frame['revenue_per_customer']
+    cac = frame['customer_acquisition_cost']
+    retention = frame['customer_retention']
+
+    health = sum(weight * frame[f'has_{field}'] for field, weight in HEALTH_WEIGHTS.items())
+    social = sum(frame[f'has_{field}'] for field in SOCIAL_FIELDS)
+    documents = sum(frame[f'has_{field}'] for field in DOCUMENT_FIELDS)
+    health = health + np.minimum(social * 2.5, 10) + np.minimum(documents * 3.33, 10)
+
+    costs = frame['direct_costs'] + frame['operating_expenses']
+    has_margin = (revenue > 0) & (costs > 0)
+    margin = np.divide((revenue - costs) * 100, revenue, out=np.zeros_like(revenue), where=has_margin)
+
+    has_customers = (revenue > 0) & (revenue_per_customer > 0)
+    customers = np.floor_divide(revenue, revenue_per_customer, out=np.zeros_like(revenue), where=has_customers)
+
+    # Lifetime is 1 / monthly churn, which parsers derives from the retention answer
+    churn = frame['monthly_churn']
+    has_churn = ~np.isnan(churn)
+    lifetime = np.divide(1, churn, out=np.full_like(churn, MAX_LIFETIME_MONTHS), where=has_churn & (churn > 0))
+    lifetime = np.minimum(lifetime, MAX_LIFETIME_MONTHS)
+    ltv = revenue_per_customer * lifetime
+    has_ltv_cac = (cac > 0) & (ltv > 0) & has_churn
+    ltv_cac = np.divide(ltv, cac, out=np.full_like(ltv, np.nan), where=has_ltv_cac)
+
+    return {
+        'health_score': np.minimum(health, 100),
+        'monthly_revenue': np.where(revenue > 0, revenue, np.nan),
+        'profit_margin': np.where(has_margin, margin, np.nan),
+        'estimated_customers': np.where(has_customers, customers, np.nan),
+        'customer_acquisition_cost': np.where(cac > 0, cac, np.nan),
+        'ltv_cac_ratio': ltv_cac,
+        'net_cash_flow': np.where((frame['cash_in'] > 0) | (frame['cash_out'] > 0),
+                                  frame['cash_in'] - frame['cash_out'], np.nan),
+        'retention_rate': np.where(retention > 0, retention, np.nan)
+    }
+
+
+def summarize(values: np.ndarray) -> Dict[str, Any]:
+    """Count, mean, range and percentiles over the businesses that reported a value"""
+    reported = values[~np.isnan(values)]
+    if not reported.size:
+        return {'count': 0, 'mean': None, 'min': None, 'max': None, 'percentiles': {}}
+    percentiles = np.percentile(reported, PERCENTILES)
+    return {
+        'count': int(reported.size),
+        'mean': round(float(reported.mean()), 2),
+        'min': round(float(reported.min()), 2),
+        'max': round(float(reported.max()), 2),
+        'percentiles': {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, percentiles)}
+    }
+
+
+def category_aggregates(frame: Dict[str, np.ndarray], metrics: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Per-category business counts and means of each metric over reporting businesses"""
+    names, codes = frame['category_names'], frame['category_code']
+    businesses = np.bincount(codes, minlength=len(names))
+    present = businesses > 0
+    aggregates = [{'category': str(name), 'businesses': int(total)}
+                  for name, total in zip(names[present], businesses[present])]
+
+    for metric, values in metrics.items():
+        reported = ~np.isnan(values)
+        counts = np.bincount(codes, weights=reported, minlength=len(names))[present]
+        sums = np.bincount(codes, weights=np.where(reported, values, 0), minlength=len(names))[present]
+        means = np.divide(sums, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+        for aggregate, mean in zip(aggregates, means):
+            aggregate[f'avg_{metric}'] = None if np.isnan(mean) else round(float(mean), 2)
+
+    negative = np.bincount(codes, weights=metrics['net_cash_flow'] < 0, minlength=len(names))[present]
+    for aggregate, count in zip(aggregates, negative):
+        aggregate['negative_cash_flow_share'] = round(float(count) / aggregate['businesses'], 4)
+    return sorted(aggregates, key=lambda aggregate: -aggregate['businesses'])
+
+
+class PortfolioAnalytics:
+    """Column arrays for every business, rebuilt in the background when the businesses table has changed"""
+
+    def __init__(self, store: DataStore, max_age: float = 60.0):
+        self.store = store
+        # A changed table is reloaded at most once per max_age seconds
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._frame = None
+        self._version = None
+        self._built_at = 0.0
+
+    def _build(self, version: int) -> None:
+        start = time.perf_counter()
+        frame = load_frame(self.store.iter_onboarding_data())
+        with self._lock:
+            self._frame, self._version, self._built_at = frame, version, time.time()
+        logger.info(f"Loaded analytics columns for {len(frame['user_id'])} businesses "
+                    f"in {time.perf_counter() - start:.3f}s")
+
+    def _build_in_background(self, version: int) -> None:
+        # The caller acquired _build_lock so only one rebuild runs at a time
+        try:
+            self._build(version)
+        except Exception as e:
+            logger.error(f"Analytics reload failed: {e}")
+            with self._lock:
+                # Wait out another max_age rather than retrying on every report
+                self._built_at = time.time()
+        finally:
+            self._build_lock.release()
+
+    def _rebuild_in_background(self, version: int) -> None:
+        if self._build_lock.acquire(blocking=False):
+            threading.Thread(target=self._build_in_background, args=(version,),
+                             name='analytics-reload', daemon=True).start()
+
+    def start(self) -> None:
+        """Build the first frame on a daemon thread so the first report does not wait for it"""
+        self._rebuild_in_background(self.store.get_version('businesses'))
+
+    def frame(self) -> Tuple[Dict[str, np.ndarray], float]:
+        """Return the column arrays and when they were built
+
+        A stale frame is still returned while a background thread replaces it; only the
+        very first report waits for a build.
+        """
+        version = self.store.get_version('businesses')
+        with self._lock:
+            frame, built_at = self._frame, self._built_at
+            stale = version != self._version and time.time() - built_at >= self.max_age
+        if frame is None:
+            with self._build_lock:
+                if self._frame is None:
+                    self._build(version)
+            with self._lock:
+                return self._frame, self._built_at
+        if stale:
+            self._rebuild_in_background(version)
+        return frame, built_at
+
+    def report(self, category: Optional[str] = None) -> Dict[str, Any]:
+        """Distributions and per-category aggregates, optionally limited to one category"""
+        start = time.perf_counter()
+        frame, built_at = self.frame()
+        if category:
+            selected = np.isin(frame['category_code'], np.flatnonzero(frame['category_names'] == category))
+            frame = {name: column if name == 'category_names' else column[selected] for name, column in frame.items()}
+
+        metrics = compute_metrics(frame)
+        histogram, _ = np.histogram(metrics['health_score'], bins=HEALTH_BINS)
+        return {
+            'businesses': int(len(frame['user_id'])),
+            'category': category,
+            'distributions': {metric: summarize(values) for metric, values in metrics.items()},
+            'health_histogram': {
+                'bins': [int(edge) for edge in HEALTH_BINS],
+                'counts': [int(count) for count in histogram]
+            },
+            'categories': category_aggregates(frame, metrics),
+            'data_as_of': datetime.fromtimestamp(built_at).isoformat(),
+            'compute_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
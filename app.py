@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory, Response
 import os
 import json
 import hashlib
@@ -6,6 +6,18 @@ import secrets
 from datetime import datetime
 import re
 from scraper import DataScraper
+from storage import DataStore, DuplicateEmailError, HEAVY_SECTIONS, USER_SORT_COLUMNS, WAL_TRUNCATE_BYTES
+from snapshots import SnapshotManager
+from access_stats import AccessStatsBuffer
+from serializer import FastJSONProvider
+from compression import init_compression, compress_stream, send_precompressed
+from parsers import parse_revenue_range, parse_currency, parse_cash_flow, parse_retention_rate
+from analytics import PortfolioAnalytics
+from benchmarks import CategoryBenchmarks
+from rules import RuleEngine
+from metrics_history import MetricsHistory
+from forecast import Forecaster
+import serializer
 import threading
 import time
 import openai
@@ -15,7 +27,7 @@ from error_handler import (
     retry_on_failure, log_performance, register_error_handlers,
     ProfitWiseError, ValidationError, AuthenticationError, AuthorizationError,
     DataNotFoundError, ExternalServiceError, DatabaseError, AIAnalysisError,
-    RateLimitError, error_monitor, get_user_friendly_message
+    RateLimitError, ConflictError, error_monitor, get_user_friendly_message
 )
 import logging
 
@@ -23,6 +35,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# jsonify and request.get_json use orjson when it is installed
+app.json = FastJSONProvider(app)
 
 # Generate a secure secret key for sessions
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
@@ -34,6 +48,23 @@ openai.api_key = os.environ.get('OPENAI_API_KEY')
 DATA_FILE = 'user_entries.json'
 USERS_FILE = 'users.json'
 BUSINESSES_FILE = 'businesses.json'
+DATABASE_FILE = os.environ.get('DATABASE_FILE', 'profitwise.db')
+
+# Bump when the dashboard formulas change; stale views are rebuilt on their next read
+# (or all at once with `flask --app app rebuild-dashboards`). Edits to the rules file
+# need no bump: views also record which rules built them
+DASHBOARD_FORMULA_VERSION = 4
+
+# Sections of /api/dashboard-bootstrap and the heavy business sections each one reads
+BOOTSTRAP_SECTIONS = {
+    'dashboard_data': (),
+    'dashboard_state': ('extracted_data', 'reports', 'alerts'),
+    'ai_insights': ('ai_analysis',)
+}
+DASHBOARD_STATE_SECTIONS = BOOTSTRAP_SECTIONS['dashboard_state']
+
+# Chat messages returned per page by the dashboard state and chat history endpoints
+CHAT_PAGE_SIZE = 50
 
 # Admin credentials (in production, use environment variables)
 ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
@@ -45,9 +76,47 @@ ADMIN_SECRET = os.environ.get('ADMIN_SECRET', secrets.token_urlsafe(32))
 # Initialize scraper
 scraper = DataScraper()
 
+# Initialize storage, importing the legacy JSON files on first run
+store = DataStore(DATABASE_FILE)
+if store.is_empty():
+    store.migrate_from_json(USERS_FILE, BUSINESSES_FILE)
+if store.count('waitlist') == 0:
+    store.migrate_waitlist_from_json(DATA_FILE)
+store.start_checkpointer(interval=float(os.environ.get('WAL_CHECKPOINT_INTERVAL', 30)),
+                        truncate_bytes=int(os.environ.get('WAL_TRUNCATE_BYTES', WAL_TRUNCATE_BYTES)))
+
+# Periodic business snapshots, kept off the request path
+snapshot_manager = SnapshotManager(store, os.environ.get('SNAPSHOT_DIR', 'snapshots'))
+snapshot_manager.start(interval=float(os.environ.get('SNAPSHOT_INTERVAL', 3600)))
+
+# Dashboard access counters are buffered in memory and flushed in batches
+access_stats = AccessStatsBuffer(store, flush_interval=float(os.environ.get('ACCESS_STATS_FLUSH_INTERVAL', 10)))
+access_stats.start()
+
+# Fleet-wide column arrays behind /admin/analytics
+portfolio_analytics = PortfolioAnalytics(store, max_age=float(os.environ.get('ANALYTICS_MAX_AGE', 60)))
+portfolio_analytics.start()
+
+# Per-category sorted metrics for peer percentiles on the dashboard
+category_benchmarks = CategoryBenchmarks(store, max_age=float(os.environ.get('BENCHMARKS_MAX_AGE', 300)))
+category_benchmarks.start()
+
+# Alert and recommendation rules, recompiled when the rules file changes
+rule_engine = RuleEngine(os.environ.get('RULES_FILE', os.path.join(app.root_path, 'business_rules.json')))
+
+# Metric snapshots for trend charts: on every onboarding change and on a schedule
+metrics_history = MetricsHistory(store)
+metrics_history.start(interval=float(os.environ.get('METRICS_SNAPSHOT_INTERVAL', 21600)))
+
+# Monte Carlo cash forecasts, cached by input hash
+forecaster = Forecaster()
+
 # Register error handlers
 register_error_handlers(app)
 
+# Compress JSON and HTML responses (gzip, or brotli when installed) for clients that accept it
+init_compression(app, min_size=int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)))
+
 # Template filter for timestamp conversion
 @app.template_filter('timestamp_to_date')
 def timestamp_to_date(timestamp):
@@ -71,79 +140,40 @@ def process_scraped_data_async(user_id, business_data):
         scraped_data = scraper.scrape_all_user_data(business_data)
         
         # Update business data with scraped content
-        businesses = load_businesses()
-        for business in businesses:
-            if business.get('user_id') == user_id:
-                business['scraped_data'] = scraped_data
-                business['last_scraped'] = time.time()
-                break
-        
-        save_businesses(businesses)
+        store.update_business(user_id, {
+            'scraped_data': scraped_data,
+            'last_scraped': time.time()
+        })
         print(f"Completed data scraping for user {user_id}")
         
     except Exception as e:
         print(f"Error scraping data for user {user_id}: {str(e)}")
         # Still save the business data even if scraping fails
-        businesses = load_businesses()
-        for business in businesses:
-            if business.get('user_id') == user_id:
-                business['scraping_error'] = str(e)
-                business['last_scraped'] = time.time()
-                break
-        save_businesses(businesses)
+        store.update_business(user_id, {
+            'scraping_error': str(e),
+            'last_scraped': time.time()
+        })
 
 def load_entries():
-    """Load existing entries from file"""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    return []
-
-def save_entries(entries):
-    """Save entries to file"""
-    with open(DATA_FILE, 'w') as f:
-        json.dump(entries, f, indent=2)
+    """Load existing waitlist entries from the store"""
+    return store.load_waitlist()
 
 def load_users():
-    """Load existing users from file"""
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    return []
+    """Load existing users from the store"""
+    return store.load_users()
 
 def save_users(users):
-    """Save users to file"""
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+    """Save users to the store"""
+    store.save_users(users)
 
 def load_businesses():
-    """Load existing businesses from file"""
-    if os.path.exists(BUSINESSES_FILE):
-        with open(BUSINESSES_FILE, 'r') as f:
-            return json.load(f)
-    return []
+    """Load existing businesses from the store"""
+    return store.load_businesses()
 
 def save_businesses(businesses):
-    """Save businesses to file with backup"""
+    """Save businesses to the store (backups are taken by the snapshot manager)"""
     try:
-        # Create backup of existing data
-        if os.path.exists(BUSINESSES_FILE):
-            backup_file = f"{BUSINESSES_FILE}.backup"
-            with open(BUSINESSES_FILE, 'r') as original:
-                with open(backup_file, 'w') as backup:
-                    backup.write(original.read())
-        
-        # Save new data
-        with open(BUSINESSES_FILE, 'w') as f:
-            json.dump(businesses, f, indent=2)
-        
-        # Also save to a timestamped backup
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        timestamped_backup = f"{BUSINESSES_FILE}.{timestamp}"
-        with open(timestamped_backup, 'w') as f:
-            json.dump(businesses, f, indent=2)
-        
-        print(f"Businesses saved successfully. Backup created: {timestamped_backup}")
+        store.save_businesses(businesses)
         return True
     except Exception as e:
         print(f"Error saving businesses: {e}")
@@ -257,23 +287,15 @@ def submit_waitlist():
         if not name or not email:
             return jsonify({'success': False, 'message': 'Name and email are required'}), 400
         
-        # Load existing entries
-        entries = load_entries()
-        
-        # Check if email already exists
-        if any(entry['email'] == email for entry in entries):
-            return jsonify({'success': False, 'message': 'Email already registered'}), 400
-        
-        # Add new entry
-        new_entry = {
+        # Add new entry; the store allocates the id and rejects duplicate emails
+        new_entry = store.add_waitlist_entry({
             'name': name,
             'email': email,
-            'timestamp': datetime.now().isoformat(),
-            'id': len(entries) + 1
-        }
+            'timestamp': datetime.now().isoformat()
+        })
         
-        entries.append(new_entry)
-        save_entries(entries)
+        if new_entry is None:
+            return jsonify({'success': False, 'message': 'Email already registered'}), 400
         
         return jsonify({
             'success': True, 
@@ -290,51 +312,89 @@ def view_entries():
     entries = load_entries()
     return jsonify(entries)
 
+def parse_number_arg(name, cast=float, minimum=None, maximum=None, default=None):
+    """Read a numeric query parameter, raising ValidationError when it is malformed"""
+    raw = request.args.get(name)
+    if raw in (None, ''):
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise ValidationError(f"{name} must be a number", field=name)
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValidationError(f"{name} must be between {minimum} and {maximum}", field=name)
+    return value
+
+def with_etag(response):
+    """Tag a JSON response with a strong content ETag and answer 304 if the client already has it"""
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest()[:32])
+    # Per-user data: browsers may keep it but must revalidate before reuse
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 @app.route('/admin/users')
 @require_admin_auth
+@handle_errors
 def view_users():
-    """Admin view to see all users"""
-    users = load_users()
-    businesses = load_businesses()
+    """Admin view to page through users with their business profiles
+
+    Query parameters:
+        page, page_size: 1-based page number and page size (max 500)
+        sort: id, email, name, created_at, last_login, category or data_completeness;
+              prefix with '-' for descending order
+        category: exact business category
+        min_completeness, max_completeness: data completeness range (0-100)
+        onboarding: 'completed' or 'pending'
+    """
+    page = parse_number_arg('page', int, minimum=1, default=1)
+    page_size = parse_number_arg('page_size', int, minimum=1, maximum=500, default=50)
+    min_completeness = parse_number_arg('min_completeness', minimum=0, maximum=100)
+    max_completeness = parse_number_arg('max_completeness', minimum=0, maximum=100)
+    
+    sort = request.args.get('sort', 'id')
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in USER_SORT_COLUMNS:
+        raise ValidationError(f"sort must be one of {', '.join(USER_SORT_COLUMNS)}", field='sort')
+    
+    onboarding = request.args.get('onboarding')
+    if onboarding not in (None, 'completed', 'pending'):
+        raise ValidationError("onboarding must be 'completed' or 'pending'", field='onboarding')
+    
+    rows, total = store.list_users_with_businesses(
+        page=page, page_size=page_size, sort=sort, descending=descending,
+        category=request.args.get('category'), min_completeness=min_completeness,
+        max_completeness=max_completeness, onboarding=onboarding
+    )
     
     # Remove password hashes for security and add business data
     safe_users = []
-    for user in users:
-        safe_user = user.copy()
-        del safe_user['password']
-        
-        # Add business profile data
-        user_business = next((b for b in businesses if b['user_id'] == user['id']), None)
-        if user_business:
-            safe_user['business_profile'] = {
-                'business_name': user_business.get('business_name'),
-                'category': user_business.get('category'),
-                'website_url': user_business.get('website_url'),
-                'data_completeness': user_business.get('data_completeness', 0),
-                'onboarding_completed_at': user_business.get('onboarding_completed_at'),
-                'financial_data': user_business.get('financial_data', {}),
-                'files_count': len(user_business.get('files', []))
-            }
-        else:
-            safe_user['business_profile'] = None
-            
+    for row in rows:
+        safe_user = row['user']
+        safe_user.pop('password', None)
+        safe_user.pop('password_hash', None)
+        safe_user['business_profile'] = row['business']
         safe_users.append(safe_user)
-    return jsonify(safe_users)
+    
+    return jsonify({
+        'users': safe_users,
+        'page': page,
+        'page_size': page_size,
+        'total': total,
+        'total_pages': (total + page_size - 1) // page_size
+    })
 
 @app.route('/admin/user/<int:user_id>')
 @require_admin_auth
 def view_user_details(user_id):
     """Admin view to see detailed user information"""
-    users = load_users()
-    businesses = load_businesses()
-    
     # Find user
-    user = next((u for u in users if u['id'] == user_id), None)
+    user = store.get_user(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
     # Find business profile
-    business = next((b for b in businesses if b['user_id'] == user_id), None)
+    business = store.get_business_by_user(user_id)
     
     # Remove password for security
     safe_user = user.copy()
@@ -342,38 +402,124 @@ def view_user_details(user_id):
     
     # Add business data
     if business:
+        chat_history = list(store.iter_chat_messages(user_id))
+        if chat_history:
+            business['chat_history'] = chat_history
         safe_user['business_profile'] = business
     else:
         safe_user['business_profile'] = None
     
     return jsonify(safe_user)
 
-@app.route('/admin/export')
-@require_admin_auth
-def export_all_data():
-    """Export all user and business data"""
-    users = load_users()
-    businesses = load_businesses()
-    entries = load_entries()
-    
-    # Remove passwords for security
-    safe_users = []
-    for user in users:
-        safe_user = user.copy()
-        del safe_user['password']
-        safe_users.append(safe_user)
+EXPORT_SECTIONS = ('users', 'businesses', 'waitlist_entries')
+
+def generate_export(sections, export_format):
+    """Yield an export document record by record so memory stays flat"""
+    def safe_users():
+        # Remove passwords for security
+        for user in store.iter_users():
+            safe_user = user.copy()
+            safe_user.pop('password', None)
+            safe_user.pop('password_hash', None)
+            yield safe_user
     
-    export_data = {
-        'export_date': datetime.now().isoformat(),
-        'total_users': len(safe_users),
-        'total_businesses': len(businesses),
-        'total_entries': len(entries),
+    sources = {
         'users': safe_users,
-        'businesses': businesses,
-        'waitlist_entries': entries
+        'businesses': lambda: store.iter_businesses(chat_history=True),
+        'waitlist_entries': store.iter_waitlist
     }
+    export_date = datetime.now().isoformat()
+    
+    if export_format == 'ndjson':
+        yield serializer.dumps({'section': 'export', 'record': {'export_date': export_date, 'sections': sections}}) + '\n'
+        for section in sections:
+            for record in sources[section]():
+                yield serializer.dumps({'section': section, 'record': record}) + '\n'
+        return
+    
+    # Chunked JSON document with the same shape as the original export
+    totals = {
+        'users': ('total_users', lambda: store.count('users')),
+        'businesses': ('total_businesses', lambda: store.count('businesses')),
+        'waitlist_entries': ('total_entries', lambda: store.count('waitlist'))
+    }
+    header = {'export_date': export_date}
+    for section in sections:
+        key, counter = totals[section]
+        header[key] = counter()
+    yield serializer.dumps(header)[:-1]
+    for section in sections:
+        yield f',"{section}":['
+        for index, record in enumerate(sources[section]()):
+            yield (',' if index else '') + serializer.dumps(record)
+        yield ']'
+    yield '}'
+
+@app.route('/admin/export')
+@require_admin_auth
+def export_all_data():
+    """Export all user and business data as a stream
+
+    Query parameters:
+        format: 'json' (default, one chunked JSON document) or 'ndjson' (one record per line)
+        sections: comma-separated subset of users, businesses, waitlist_entries
+        gzip: '1' to download the export gzip-compressed
+    """
+    export_format = request.args.get('format', 'json')
+    if export_format not in ('json', 'ndjson'):
+        return jsonify({'error': 'format must be json or ndjson'}), 400
+    
+    requested = request.args.get('sections')
+    sections = [s.strip() for s in requested.split(',') if s.strip()] if requested else list(EXPORT_SECTIONS)
+    unknown = [s for s in sections if s not in EXPORT_SECTIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+    
+    chunks = generate_export(sections, export_format)
+    mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+    
+    if request.args.get('gzip') == '1':
+        filename = f"profitwise-export-{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}.gz"
+        return Response(
+            compress_stream(chunks, 'gzip'),
+            mimetype='application/gzip',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
     
-    return jsonify(export_data)
+    return Response(chunks, mimetype=mimetype)
+
+@app.route('/admin/storage-stats')
+@require_admin_auth
+def storage_stats():
+    """Admin view of storage cache hit/miss counters"""
+    return jsonify({
+        'cache': store.cache_stats(),
+        'forecast_cache': forecaster.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/admin/analytics')
+@require_admin_auth
+def admin_analytics():
+    """Portfolio distributions and per-category aggregates of health scores and unit economics
+
+    Query parameters:
+        category: limit the report to one business category
+    """
+    return jsonify(portfolio_analytics.report(category=request.args.get('category') or None))
+
+@app.route('/admin/rules')
+@require_admin_auth
+def admin_rules():
+    """Which alert and recommendation rules fire on live requests, and what each costs to evaluate
+
+    Query parameters:
+        batch: '1' to also evaluate every rule over all businesses
+    """
+    payload = {'live': rule_engine.stats()}
+    if request.args.get('batch') == '1':
+        payload['batch'] = rule_engine.evaluate_batch(store.iter_onboarding_data())
+    return jsonify(payload)
 
 @app.route('/admin')
 @require_admin_auth
@@ -423,27 +569,18 @@ def user_login():
                 'message': 'Email and password are required'
             }), 400
         
-        # Load users from file
-        users = load_users()
-        
-        # Find user by email
-        user = next((u for u in users if u['email'] == email), None)
+        # Find user by email through the normalized email index
+        user = store.get_user_by_email(email)
         
         if user and verify_password(password, user['password']):
-            # Update user login information
-            user['last_login'] = datetime.now().isoformat()
-            user['login_count'] = user.get('login_count', 0) + 1
-            user['last_activity'] = datetime.now().isoformat()
-            user['last_ip'] = request.remote_addr
-            user['last_user_agent'] = request.headers.get('User-Agent', '')
-            
-            # Save updated user data
-            users = load_users()
-            for i, u in enumerate(users):
-                if u['id'] == user['id']:
-                    users[i] = user
-                    break
-            save_users(users)
+            # Update user login information in place, leaving other users untouched
+            store.update_user(user['id'], {
+                'last_login': datetime.now().isoformat(),
+                'login_count': user.get('login_count', 0) + 1,
+                'last_activity': datetime.now().isoformat(),
+                'last_ip': request.remote_addr,
+                'last_user_agent': request.headers.get('User-Agent', '')
+            })
             
             session['user_authenticated'] = True
             session['user_email'] = email
@@ -475,8 +612,7 @@ def dashboard():
     
     # Check if user has completed onboarding
     user_id = session.get('user_id')
-    businesses = load_businesses()
-    user_business = next((b for b in businesses if b['user_id'] == user_id), None)
+    user_business = store.get_business_by_user(user_id, sections=())
     
     if not user_business:
         # Redirect to onboarding if no business data
@@ -493,8 +629,7 @@ def dashboard_page():
         return redirect(url_for('login_page'))
     
     user_id = session.get('user_id')
-    businesses = load_businesses()
-    user_business = next((b for b in businesses if b['user_id'] == user_id), None)
+    user_business = store.get_business_by_user(user_id, sections=())
     
     if not user_business:
         return redirect(url_for('onboarding_page'))
@@ -508,7 +643,7 @@ def dashboard_page():
 def dashboard_static(filename):
     """Serve Next.js static assets"""
     try:
-        return send_from_directory('dashboard/out/_next', filename)
+        return send_precompressed('dashboard/out/_next', filename)
     except FileNotFoundError:
         return "Asset not found", 404
 
@@ -535,22 +670,60 @@ def get_dashboard_data():
     # Validate authentication
     user_id = validate_user_authentication()
     
-    # Load business data safely
-    businesses = safe_file_operation(load_businesses)
-    user_business = next((b for b in businesses if b['user_id'] == user_id), None)
+    # Serve the materialized view; it is rebuilt here only if missing or built by older formulas
+    dashboard_json = safe_file_operation(store.get_dashboard_view_json, user_id, dashboard_formula_version())
+    if dashboard_json is None:
+        dashboard_json = refresh_dashboard_view(user_id)
     
-    if not user_business:
+    if dashboard_json is None:
         raise DataNotFoundError("Business profile not found", resource="business_profile")
     
-    # Update last access time
-    user_business['last_access'] = datetime.now().isoformat()
-    user_business['access_count'] = user_business.get('access_count', 0) + 1
-    
-    # Save updated access info safely
-    businesses = [b for b in businesses if b['user_id'] != user_id]
-    businesses.append(user_business)
-    safe_file_operation(save_businesses, businesses)
+    # Count the access; the buffer flushes it to the store in the background
+    access_stats.record(user_id)
     
+    return with_etag(app.response_class(f"{with_benchmarks(user_id, dashboard_json)}\n", mimetype='application/json'))
+
+def with_benchmarks(user_id, dashboard_json):
+    """Add the user's category percentiles to a stored view without decoding it
+
+    Percentiles move as peers change, so they are looked up per request instead of stored in the view.
+    """
+    benchmarks = category_benchmarks.percentiles(user_id)
+    return f'{dashboard_json[:-1]},"benchmarks":{serializer.dumps(benchmarks)}}}'
+
+def record_business_change(user_business):
+    """Update the category benchmarks and metric history after a business's onboarding data changed"""
+    category_benchmarks.update(user_business)
+    try:
+        metrics_history.record([user_business])
+    except Exception as e:
+        # History is best effort; the change itself is already saved
+        logger.error(f"Failed to record metric snapshot for user {user_business.get('user_id')}: {e}")
+
+def dashboard_formula_version():
+    """Version stored with each dashboard view: the formula version plus a checksum of the rules file"""
+    rule_engine.refresh()
+    return (DASHBOARD_FORMULA_VERSION << 32) | rule_engine.version
+
+def refresh_dashboard_view(user_id, user_business=None):
+    """Recompute and store a user's dashboard view, returning its JSON or None without a business"""
+    if user_business is None:
+        user_business = store.get_business_by_user(user_id, sections=())
+    if not user_business:
+        return None
+    return store.save_dashboard_view(user_id, dashboard_formula_version(), build_dashboard_data(user_business))
+
+@app.cli.command('rebuild-dashboards')
+def rebuild_dashboards_command():
+    """Rebuild every materialized dashboard view after a formula change"""
+    count = 0
+    for business in store.iter_businesses(sections=()):
+        refresh_dashboard_view(business.get('user_id'), business)
+        count += 1
+    print(f"Rebuilt {count} dashboard views (formula version {DASHBOARD_FORMULA_VERSION}, rules version {rule_engine.version})")
+
+def build_dashboard_data(user_business):
+    """Compute the dashboard payload from a business's onboarding data"""
     # Extract and format data for dashboard
     onboarding_data = user_business.get('onboarding_data', {})
     
@@ -564,6 +737,7 @@ def get_dashboard_data():
     estimated_customers = calculate_estimated_customers(monthly_revenue, revenue_per_customer)
     profit_margin = calculate_profit_margin(monthly_revenue, onboarding_data)
     health_score = calculate_health_score(onboarding_data)
+    findings = rule_engine.evaluate(onboarding_data)
     
     dashboard_data = {
         'business_info': {
@@ -624,66 +798,11 @@ def get_dashboard_data():
             'ad_platforms': onboarding_data.get('ad_platforms', '')
         },
         'health_score': health_score,
-        'alerts': generate_business_alerts(onboarding_data),
-        'recommendations': generate_business_recommendations(onboarding_data)
-    }
-    
-    return jsonify(dashboard_data)
-
-def parse_revenue_range(revenue_str):
-    """Parse revenue range string to get average value"""
-    if not revenue_str:
-        return 0
-    
-    # Extract numbers from strings like "$50,000 - $75,000"
-    import re
-    numbers = re.findall(r'[\d,]+', revenue_str.replace('$', '').replace(',', ''))
-    if len(numbers) >= 2:
-        return (int(numbers[0]) + int(numbers[1])) // 2
-    elif len(numbers) == 1:
-        return int(numbers[0])
-    return 0
-
-def parse_currency(currency_str):
-    """Parse currency string to get numeric value"""
-    if not currency_str:
-        return 0
-    
-    import re
-    numbers = re.findall(r'[\d,]+', currency_str.replace('$', '').replace(',', ''))
-    if numbers:
-        return int(numbers[0])
-    return 0
-
-def parse_cash_flow(cash_flow_str):
-    """Parse cash flow string like '$60,000 in, $45,000 out'"""
-    if not cash_flow_str:
-        return {'in': 0, 'out': 0, 'net': 0}
-    
-    import re
-    # Look for patterns like "in" and "out"
-    in_match = re.search(r'(\d+(?:,\d+)*).*in', cash_flow_str, re.IGNORECASE)
-    out_match = re.search(r'(\d+(?:,\d+)*).*out', cash_flow_str, re.IGNORECASE)
-    
-    cash_in = int(in_match.group(1).replace(',', '')) if in_match else 0
-    cash_out = int(out_match.group(1).replace(',', '')) if out_match else 0
-    
-    return {
-        'in': cash_in,
-        'out': cash_out,
-        'net': cash_in - cash_out
+        'alerts': findings['alerts'],
+        'recommendations': findings['recommendations']
     }
-
-def parse_retention_rate(retention_str):
-    """Parse retention rate from string"""
-    if not retention_str:
-        return 0
     
-    import re
-    numbers = re.findall(r'(\d+(?:\.\d+)?)', retention_str)
-    if numbers:
-        return float(numbers[0])
-    return 0
+    return dashboard_data
 
 def calculate_estimated_customers(monthly_revenue, revenue_per_customer):
     """Calculate estimated number of customers"""
@@ -755,80 +874,6 @@ def calculate_health_score(onboarding_data):
     
     return min(score, max_score)
 
-def generate_business_alerts(onboarding_data):
-    """Generate business alerts based on onboarding data"""
-    alerts = []
-    
-    # Cash flow alerts
-    cash_flow = parse_cash_flow(onboarding_data.get('cash_flow', ''))
-    if cash_flow['net'] < 0:
-        alerts.append({
-            'type': 'warning',
-            'title': 'Negative Cash Flow',
-            'message': 'Your cash outflow exceeds inflow. Consider reviewing expenses or increasing revenue.'
-        })
-    
-    # Low retention rate
-    retention = parse_retention_rate(onboarding_data.get('customer_retention', ''))
-    if retention > 0 and retention < 70:
-        alerts.append({
-            'type': 'warning',
-            'title': 'Low Customer Retention',
-            'message': f'Your customer retention rate of {retention}% is below industry average. Consider improving customer experience.'
-        })
-    
-    # High CAC
-    cac = parse_currency(onboarding_data.get('customer_acquisition_cost', ''))
-    revenue_per_customer = parse_currency(onboarding_data.get('revenue_per_customer', ''))
-    if cac > 0 and revenue_per_customer > 0 and (cac / revenue_per_customer) > 0.3:
-        alerts.append({
-            'type': 'info',
-            'title': 'High Customer Acquisition Cost',
-            'message': 'Your CAC is high relative to customer value. Consider optimizing marketing channels.'
-        })
-    
-    return alerts
-
-def generate_business_recommendations(onboarding_data):
-    """Generate business recommendations based on onboarding data"""
-    recommendations = []
-    
-    # Revenue diversification
-    if onboarding_data.get('revenue_type') == 'one-time':
-        recommendations.append({
-            'category': 'Revenue',
-            'title': 'Consider Recurring Revenue',
-            'description': 'Explore subscription models or recurring services to stabilize cash flow.'
-        })
-    
-    # Social media presence
-    social_count = sum(1 for key in ['linkedin_page', 'twitter_handle', 'instagram_account', 'facebook_page'] 
-                      if onboarding_data.get(key))
-    if social_count < 2:
-        recommendations.append({
-            'category': 'Marketing',
-            'title': 'Expand Social Media Presence',
-            'description': 'Increase your social media presence to reach more customers and build brand awareness.'
-        })
-    
-    # Financial tracking
-    if not onboarding_data.get('financial_tools'):
-        recommendations.append({
-            'category': 'Operations',
-            'title': 'Implement Financial Tracking',
-            'description': 'Use proper financial software to track expenses, revenue, and profitability more accurately.'
-        })
-    
-    # Growth opportunities
-    if onboarding_data.get('upsell_cross_sell') == 'no':
-        recommendations.append({
-            'category': 'Growth',
-            'title': 'Develop Upselling Strategy',
-            'description': 'Create additional revenue streams by upselling or cross-selling to existing customers.'
-        })
-    
-    return recommendations
-
 @app.route('/api/process-documents', methods=['POST'])
 def process_documents():
     """Process uploaded documents and extract data"""
@@ -879,17 +924,10 @@ def process_documents():
         
         # Update user's business data with extracted information
         user_id = session.get('user_id')
-        businesses = load_businesses()
-        user_business = next((b for b in businesses if b['user_id'] == user_id), None)
-        
-        if user_business:
-            user_business['extracted_data'] = extracted_data
-            user_business['updated_at'] = datetime.now().isoformat()
-            
-            # Save updated data
-            businesses = [b for b in businesses if b['user_id'] != user_id]
-            businesses.append(user_business)
-            save_businesses(businesses)
+        store.update_business(user_id, {
+            'extracted_data': extracted_data,
+            'updated_at': datetime.now().isoformat()
+        })
         
         return jsonify({
             'success': True,
@@ -1093,7 +1131,7 @@ def analyze_business_with_ai(business_data):
         As a business analyst and AI consultant, analyze this business data and provide comprehensive insights:
 
         Business Profile:
-        {json.dumps(business_profile, indent=2)}
+        {serializer.dumps(business_profile, indent=True)}
 
         Please provide a detailed analysis in the following JSON format:
         {{
@@ -1324,6 +1362,35 @@ def generate_ai_insights(business_data):
         print(f"Error generating AI insights: {e}")
         return {"error": f"AI insights failed: {str(e)}"}
 
+# Keys a dashboard PATCH may carry besides its base version
+DASHBOARD_PATCH_DICTS = ('dashboard_state', 'analytics', 'extracted_data')
+DASHBOARD_PATCH_LISTS = ('reports', 'alerts', 'chat_history')
+
+def merge_items_by_id(existing, incoming):
+    """Merge list items, replacing items that share an id and skipping exact repeats"""
+    merged = list(existing or [])
+    positions = {item['id']: index for index, item in enumerate(merged)
+                 if isinstance(item, dict) and item.get('id') is not None}
+    for item in incoming:
+        if isinstance(item, dict) and item.get('id') is not None:
+            if item['id'] in positions:
+                merged[positions[item['id']]] = item
+            else:
+                positions[item['id']] = len(merged)
+                merged.append(item)
+        elif item not in merged:
+            merged.append(item)
+    return merged
+
+def apply_dict_patch(target, patch):
+    """Set changed keys on a dict in place; a None value removes the key"""
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = value
+    return target
+
 @app.route('/api/save-dashboard-state', methods=['POST'])
 def save_dashboard_state():
     """Save dashboard state and user interactions"""
@@ -1333,73 +1400,59 @@ def save_dashboard_state():
     try:
         data = request.get_json()
         user_id = session.get('user_id')
-        businesses = load_businesses()
-        user_business = next((b for b in businesses if b['user_id'] == user_id), None)
         
-        if not user_business:
+        def apply_state(user_business):
+            # Save dashboard state
+            dashboard_state = {
+                'active_section': data.get('active_section', 'Overview'),
+                'last_updated': datetime.now().isoformat(),
+                'user_preferences': data.get('user_preferences', {}),
+                'viewed_sections': data.get('viewed_sections', []),
+                'interactions': data.get('interactions', []),
+                'bookmarks': data.get('bookmarks', []),
+                'notes': data.get('notes', {}),
+                'filters': data.get('filters', {}),
+                'settings': data.get('settings', {})
+            }
+            
+            user_business['dashboard_state'] = dashboard_state
+            user_business['last_dashboard_update'] = datetime.now().isoformat()
+            user_business['dashboard_version'] = user_business.get('dashboard_version', 0) + 1
+            
+            # Save extracted data if provided
+            if 'extracted_data' in data:
+                user_business['extracted_data'] = data['extracted_data']
+            
+            # Save analytics data
+            if 'analytics' in data:
+                if 'analytics' not in user_business:
+                    user_business['analytics'] = {}
+                user_business['analytics'].update(data['analytics'])
+            
+            # Save reports and exports
+            if 'reports' in data:
+                user_business['reports'] = merge_items_by_id(user_business.get('reports'), data['reports'])
+            
+            # Save alerts and notifications
+            if 'alerts' in data:
+                user_business['alerts'] = merge_items_by_id(user_business.get('alerts'), data['alerts'])
+        
+        # Update business data, retrying if another writer got there first
+        touched_sections = tuple(name for name in HEAVY_SECTIONS if name in data)
+        user_business = store.modify_business(user_id, apply_state, sections=touched_sections)
+        if user_business is None:
             return jsonify({'error': 'No business data found'}), 404
         
-        # Save dashboard state
-        dashboard_state = {
-            'active_section': data.get('active_section', 'Overview'),
-            'last_updated': datetime.now().isoformat(),
-            'user_preferences': data.get('user_preferences', {}),
-            'viewed_sections': data.get('viewed_sections', []),
-            'interactions': data.get('interactions', []),
-            'bookmarks': data.get('bookmarks', []),
-            'notes': data.get('notes', {}),
-            'filters': data.get('filters', {}),
-            'settings': data.get('settings', {})
-        }
+        # Save AI chat history to the append-only chat log; messages it already holds are skipped
+        if data.get('chat_history'):
+            store.append_chat_messages(user_id, data['chat_history'])
         
-        user_business['dashboard_state'] = dashboard_state
-        user_business['last_dashboard_update'] = datetime.now().isoformat()
-        
-        # Save extracted data if provided
-        if 'extracted_data' in data:
-            user_business['extracted_data'] = data['extracted_data']
-        
-        # Save analytics data
-        if 'analytics' in data:
-            if 'analytics' not in user_business:
-                user_business['analytics'] = {}
-            user_business['analytics'].update(data['analytics'])
-        
-        # Save AI chat history
-        if 'chat_history' in data:
-            if 'chat_history' not in user_business:
-                user_business['chat_history'] = []
-            user_business['chat_history'].extend(data['chat_history'])
-            # Keep only last 100 messages
-            user_business['chat_history'] = user_business['chat_history'][-100:]
-        
-        # Save reports and exports
-        if 'reports' in data:
-            if 'reports' not in user_business:
-                user_business['reports'] = []
-            user_business['reports'].extend(data['reports'])
-        
-        # Save alerts and notifications
-        if 'alerts' in data:
-            if 'alerts' not in user_business:
-                user_business['alerts'] = []
-            user_business['alerts'].extend(data['alerts'])
-        
-        # Update business data
-        businesses = [b for b in businesses if b['user_id'] != user_id]
-        businesses.append(user_business)
-        
-        if save_businesses(businesses):
-            return jsonify({
-                'success': True,
-                'message': 'Dashboard state saved successfully',
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to save data'
-            }), 500
+        return jsonify({
+            'success': True,
+            'message': 'Dashboard state saved successfully',
+            'version': user_business['dashboard_version'],
+            'timestamp': datetime.now().isoformat()
+        })
             
     except Exception as e:
         return jsonify({
@@ -1407,6 +1460,80 @@ def save_dashboard_state():
             'error': str(e)
         }), 500
 
+@app.route('/api/save-dashboard-state', methods=['PATCH'])
+@handle_errors
+def patch_dashboard_state():
+    """Apply an incremental dashboard update against the version the client last saw
+
+    Body: {"version": n, "dashboard_state": {...}, "analytics": {...}, "extracted_data": {...},
+           "reports": [...], "alerts": [...], "chat_history": [...]}, all but version optional.
+    Dicts carry only changed keys (null removes a key), report and alert items are upserted
+    by id, and chat messages the log already holds are skipped, so re-applying a patch is
+    harmless. A stale version is rejected with 409.
+    """
+    user_id = validate_user_authentication()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValidationError("Request data is required")
+    
+    base_version = data.get('version')
+    if not isinstance(base_version, int) or isinstance(base_version, bool):
+        raise ValidationError("version must be an integer", field='version')
+    unknown = set(data) - {'version', *DASHBOARD_PATCH_DICTS, *DASHBOARD_PATCH_LISTS}
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    for key in DASHBOARD_PATCH_DICTS:
+        if key in data and not isinstance(data[key], dict):
+            raise ValidationError(f"{key} must be an object", field=key)
+    for key in DASHBOARD_PATCH_LISTS:
+        if key in data and not isinstance(data[key], list):
+            raise ValidationError(f"{key} must be a list", field=key)
+    
+    # Reject stale writes from the small cached core record before loading any sections
+    current = store.get_business_by_user(user_id, sections=())
+    if not current:
+        raise DataNotFoundError("Business profile not found", resource="business_profile")
+    if current.get('dashboard_version', 0) != base_version:
+        raise ConflictError("Dashboard state has changed since version "
+                            f"{base_version}", current_version=current.get('dashboard_version', 0))
+    
+    if not any(data.get(key) for key in (*DASHBOARD_PATCH_DICTS, *DASHBOARD_PATCH_LISTS)):
+        return jsonify({'success': True, 'version': base_version})
+    
+    def apply_patch(user_business):
+        # Re-checked here in case another save landed after the check above
+        version = user_business.get('dashboard_version', 0)
+        if version != base_version:
+            raise ConflictError("Dashboard state has changed since version "
+                                f"{base_version}", current_version=version)
+        
+        for key in DASHBOARD_PATCH_DICTS:
+            if data.get(key):
+                user_business[key] = apply_dict_patch(dict(user_business.get(key) or {}), data[key])
+        for key in ('reports', 'alerts'):
+            if data.get(key):
+                user_business[key] = merge_items_by_id(user_business.get(key), data[key])
+        
+        now = datetime.now().isoformat()
+        user_business.setdefault('dashboard_state', {})['last_updated'] = now
+        user_business['last_dashboard_update'] = now
+        user_business['dashboard_version'] = version + 1
+    
+    touched_sections = tuple(name for name in HEAVY_SECTIONS if data.get(name))
+    user_business = store.modify_business(user_id, apply_patch, sections=touched_sections)
+    if user_business is None:
+        raise DataNotFoundError("Business profile not found", resource="business_profile")
+    
+    # Chat goes to the append-only chat log once the versioned write has succeeded
+    if data.get('chat_history'):
+        store.append_chat_messages(user_id, data['chat_history'])
+    
+    return jsonify({
+        'success': True,
+        'version': user_business['dashboard_version'],
+        'timestamp': user_business['last_dashboard_update']
+    })
+
 @app.route('/api/get-dashboard-state')
 def get_dashboard_state():
     """Get saved dashboard state for user"""
@@ -1414,24 +1541,100 @@ def get_dashboard_state():
         return jsonify({'error': 'Not authenticated'}), 401
     
     user_id = session.get('user_id')
-    businesses = load_businesses()
-    user_business = next((b for b in businesses if b['user_id'] == user_id), None)
+    # Include accesses that are still buffered in memory
+    user_business = access_stats.merge(user_id, store.get_business_by_user(
+        user_id, sections=DASHBOARD_STATE_SECTIONS
+    ))
     
     if not user_business:
         return jsonify({'error': 'No business data found'}), 404
     
-    return jsonify({
+    return with_etag(jsonify(build_dashboard_state(user_id, user_business)))
+
+def build_dashboard_state(user_id, user_business):
+    """Assemble the saved dashboard state payload for a user's business"""
+    # Only the latest page of chat; older pages come from /api/chat-history
+    chat_history, chat_next_before = store.get_chat_messages(user_id, limit=CHAT_PAGE_SIZE)
+    
+    return {
         'dashboard_state': user_business.get('dashboard_state', {}),
+        'version': user_business.get('dashboard_version', 0),
         'extracted_data': user_business.get('extracted_data', {}),
         'analytics': user_business.get('analytics', {}),
-        'chat_history': user_business.get('chat_history', []),
+        'chat_history': chat_history,
+        'chat_history_next_before': chat_next_before,
         'reports': user_business.get('reports', []),
         'alerts': user_business.get('alerts', []),
         'last_updated': user_business.get('last_dashboard_update', ''),
         'access_count': user_business.get('access_count', 0),
         'last_access': user_business.get('last_access', '')
+    }
+
+@app.route('/api/chat-history')
+@handle_errors
+def get_chat_history():
+    """Page backwards through the user's chat log
+
+    Query parameters:
+        before: message id cursor from a previous page's next_before
+        limit: page size (max 200)
+        include_archived: '1' to page past the active window into archived messages
+    """
+    user_id = validate_user_authentication()
+    before = parse_number_arg('before', int, minimum=1)
+    limit = parse_number_arg('limit', int, minimum=1, maximum=200, default=CHAT_PAGE_SIZE)
+    include_archived = request.args.get('include_archived') == '1'
+    
+    messages, next_before = store.get_chat_messages(
+        user_id, before=before, limit=limit, include_archived=include_archived
+    )
+    
+    return jsonify({
+        'messages': messages,
+        'next_before': next_before
     })
 
+@app.route('/api/metrics-history')
+@handle_errors
+def get_metrics_history():
+    """Trend of one dashboard metric for the current user
+
+    Query parameters:
+        metric: monthly_revenue (default), profit_margin, health_score, net_cash_flow, retention_rate or access_count
+        range: 48h, 7d, 30d (default), 90d, 1y, 2y or 5y
+    """
+    user_id = validate_user_authentication()
+    try:
+        series = metrics_history.series(
+            user_id, request.args.get('metric', 'monthly_revenue'), request.args.get('range', '30d')
+        )
+    except ValueError as e:
+        raise ValidationError(str(e))
+    return with_etag(jsonify(series))
+
+@app.route('/api/forecast')
+@handle_errors
+@log_performance
+def get_forecast():
+    """Monte Carlo cash forecast with runway and shortfall probabilities for the current user
+
+    Query parameters:
+        months: forecast horizon, 1-60 (default 24)
+        paths: simulated paths, 100-10000 (default 5000)
+        cash_on_hand: starting cash balance; defaults to three months of outflow
+    """
+    user_id = validate_user_authentication()
+    months = parse_number_arg('months', int, minimum=1, maximum=60, default=24)
+    paths = parse_number_arg('paths', int, minimum=100, maximum=10000, default=5000)
+    cash_on_hand = parse_number_arg('cash_on_hand', float, minimum=0)
+    
+    user_business = safe_file_operation(store.get_business_by_user, user_id, sections=())
+    if not user_business:
+        raise DataNotFoundError("Business profile not found", resource="business_profile")
+    
+    forecast_json = forecaster.forecast_json(user_business.get('onboarding_data') or {}, months, paths, cash_on_hand)
+    return with_etag(app.response_class(f"{forecast_json}\n", mimetype='application/json'))
+
 @app.route('/api/export-user-data')
 def export_user_data():
     """Export all user data for backup"""
@@ -1439,11 +1642,12 @@ def export_user_data():
         return jsonify({'error': 'Not authenticated'}), 401
     
     user_id = session.get('user_id')
-    businesses = load_businesses()
-    user_business = next((b for b in businesses if b['user_id'] == user_id), None)
+    # Include accesses that are still buffered in memory
+    user_business = access_stats.merge(user_id, store.get_business_by_user(user_id))
     
     if not user_business:
         return jsonify({'error': 'No business data found'}), 404
+    user_business['chat_history'] = list(store.iter_chat_messages(user_id))
     
     # Create comprehensive export
     export_data = {
@@ -1472,7 +1676,6 @@ def import_user_data():
     try:
         data = request.get_json()
         user_id = session.get('user_id')
-        businesses = load_businesses()
         
         # Validate import data
         if 'business_profile' not in data:
@@ -1480,34 +1683,33 @@ def import_user_data():
         
         import_data = data['business_profile']
         
-        # Update user's business data
-        user_business = next((b for b in businesses if b['user_id'] == user_id), None)
-        if user_business:
-            # Merge imported data
+        # Chat goes to the chat log, which skips messages this user already has
+        imported_chat = import_data.pop('chat_history', None) or []
+        store.append_chat_messages(user_id, imported_chat)
+        
+        # Merge imported data into the user's business, keeping it attached to this user
+        def merge_import(user_business):
             user_business.update(import_data)
+            user_business['user_id'] = user_id
             user_business['imported_at'] = datetime.now().isoformat()
             user_business['import_source'] = data.get('user_info', {}).get('export_timestamp', 'unknown')
-        else:
+        
+        user_business = store.modify_business(user_id, merge_import)
+        if user_business is None:
             # Create new business profile
             import_data['user_id'] = user_id
             import_data['imported_at'] = datetime.now().isoformat()
-            user_business = import_data
+            user_business = store.upsert_business(import_data)
         
-        # Save updated data
-        businesses = [b for b in businesses if b['user_id'] != user_id]
-        businesses.append(user_business)
+        # Imported onboarding data changes the dashboard figures, benchmarks and history
+        refresh_dashboard_view(user_id)
+        record_business_change(user_business)
         
-        if save_businesses(businesses):
-            return jsonify({
-                'success': True,
-                'message': 'Data imported successfully',
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to save imported data'
-            }), 500
+        return jsonify({
+            'success': True,
+            'message': 'Data imported successfully',
+            'timestamp': datetime.now().isoformat()
+        })
             
     except Exception as e:
         return jsonify({
@@ -1524,8 +1726,7 @@ def run_ai_analysis():
     user_id = validate_user_authentication()
     
     # Load and validate business data
-    businesses = safe_file_operation(load_businesses)
-    user_business = next((b for b in businesses if b['user_id'] == user_id), None)
+    user_business = safe_file_operation(store.get_business_by_user, user_id, sections=('extracted_data',))
     
     if not user_business:
         raise DataNotFoundError("Business profile not found", resource="business_profile")
@@ -1535,19 +1736,16 @@ def run_ai_analysis():
     ai_recommendations = generate_ai_recommendations_safe(user_business)
     ai_insights = generate_ai_insights_safe(user_business)
     
-    # Save AI analysis to business data
-    user_business['ai_analysis'] = {
-        'comprehensive_analysis': ai_analysis,
-        'recommendations': ai_recommendations,
-        'insights': ai_insights,
-        'analysis_timestamp': datetime.now().isoformat(),
-        'analysis_version': '1.0'
-    }
-    
-    # Update business data safely
-    businesses = [b for b in businesses if b['user_id'] != user_id]
-    businesses.append(user_business)
-    safe_file_operation(save_businesses, businesses)
+    # Save AI analysis to business data safely
+    safe_file_operation(store.update_business, user_id, {
+        'ai_analysis': {
+            'comprehensive_analysis': ai_analysis,
+            'recommendations': ai_recommendations,
+            'insights': ai_insights,
+            'analysis_timestamp': datetime.now().isoformat(),
+            'analysis_version': '1.0'
+        }
+    })
     
     return jsonify({
         'success': True,
@@ -1564,21 +1762,60 @@ def get_ai_insights():
         return jsonify({'error': 'Not authenticated'}), 401
     
     user_id = session.get('user_id')
-    businesses = load_businesses()
-    user_business = next((b for b in businesses if b['user_id'] == user_id), None)
+    user_business = store.get_business_by_user(user_id, sections=('ai_analysis',))
     
     if not user_business:
         return jsonify({'error': 'No business data found'}), 404
     
-    ai_data = user_business.get('ai_analysis', {})
+    return with_etag(jsonify(build_ai_insights(user_business)))
+
+def build_ai_insights(user_business):
+    """Assemble the stored AI insights payload for a user's business"""
+    ai_data = user_business.get('ai_analysis') or {}
     
-    return jsonify({
+    return {
         'analysis': ai_data.get('comprehensive_analysis', {}),
         'recommendations': ai_data.get('recommendations', {}),
         'insights': ai_data.get('insights', {}),
         'last_analysis': ai_data.get('analysis_timestamp', ''),
         'has_analysis': bool(ai_data)
-    })
+    }
+
+@app.route('/api/dashboard-bootstrap')
+@handle_errors
+def dashboard_bootstrap():
+    """Return dashboard data, saved state and AI insights for first paint in one response
+
+    Query parameters:
+        sections: comma-separated subset of dashboard_data, dashboard_state, ai_insights
+    """
+    user_id = validate_user_authentication()
+    
+    requested = request.args.get('sections')
+    sections = [s.strip() for s in requested.split(',') if s.strip()] if requested else list(BOOTSTRAP_SECTIONS)
+    unknown = [s for s in sections if s not in BOOTSTRAP_SECTIONS]
+    if unknown or not sections:
+        raise ValidationError(f"sections must be a subset of {', '.join(BOOTSTRAP_SECTIONS)}", field='sections')
+    
+    # One read of the business record with exactly the heavy sections the response needs
+    needed = tuple(dict.fromkeys(name for section in sections for name in BOOTSTRAP_SECTIONS[section]))
+    user_business = safe_file_operation(store.get_business_by_user, user_id, sections=needed)
+    if not user_business:
+        raise DataNotFoundError("Business profile not found", resource="business_profile")
+    
+    payload = {}
+    if 'dashboard_data' in sections:
+        dashboard_json = store.get_dashboard_view_json(user_id, dashboard_formula_version())
+        if dashboard_json is None:
+            dashboard_json = refresh_dashboard_view(user_id, user_business)
+        payload['dashboard_data'] = serializer.loads(with_benchmarks(user_id, dashboard_json))
+        access_stats.record(user_id)
+    if 'dashboard_state' in sections:
+        payload['dashboard_state'] = build_dashboard_state(user_id, access_stats.merge(user_id, user_business))
+    if 'ai_insights' in sections:
+        payload['ai_insights'] = build_ai_insights(user_business)
+    
+    return with_etag(jsonify(payload))
 
 # Safe wrapper functions for AI operations with error handling
 @retry_on_failure(max_retries=3, delay=1.0)
@@ -1641,8 +1878,7 @@ def ai_chat():
         raise ValidationError("Message too long (max 1000 characters)", field="message")
     
     # Get user's business data for context
-    businesses = safe_file_operation(load_businesses)
-    user_business = next((b for b in businesses if b['user_id'] == user_id), None)
+    user_business = safe_file_operation(store.get_business_by_user, user_id, sections=())
     
     if not user_business:
         raise DataNotFoundError("Business profile not found", resource="business_profile")
@@ -1674,29 +1910,19 @@ def ai_chat():
         
         ai_response = response.choices[0].message.content
         
-        # Save chat message to business data
-        if 'chat_history' not in user_business:
-            user_business['chat_history'] = []
-        
-        user_business['chat_history'].append({
-            'role': 'user',
-            'content': message,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        user_business['chat_history'].append({
-            'role': 'assistant',
-            'content': ai_response,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Keep only last 50 messages
-        user_business['chat_history'] = user_business['chat_history'][-50:]
-        
-        # Update business data safely
-        businesses = [b for b in businesses if b['user_id'] != user_id]
-        businesses.append(user_business)
-        safe_file_operation(save_businesses, businesses)
+        # Append both messages to the user's chat log; older messages are archived, not dropped
+        safe_file_operation(store.append_chat_messages, user_id, [
+            {
+                'role': 'user',
+                'content': message,
+                'timestamp': datetime.now().isoformat()
+            },
+            {
+                'role': 'assistant',
+                'content': ai_response,
+                'timestamp': datetime.now().isoformat()
+            }
+        ])
         
         return jsonify({
             'success': True,
@@ -1787,19 +2013,15 @@ def user_signup():
                 'message': 'Please enter a valid phone number'
             }), 400
         
-        # Load existing users
-        users = load_users()
-        
         # Check if email already exists
-        if any(user['email'] == email for user in users):
+        if store.get_user_by_email(email):
             return jsonify({
                 'success': False,
                 'message': 'An account with this email already exists'
             }), 400
         
-        # Create new user
+        # Create new user (the store allocates the id atomically)
         new_user = {
-            'id': len(users) + 1,
             'name': name,
             'phone': phone,
             'email': email,
@@ -1817,8 +2039,14 @@ def user_signup():
             'signup_source': 'web'
         }
         
-        users.append(new_user)
-        save_users(users)
+        try:
+            new_user = store.create_user(new_user)
+        except DuplicateEmailError:
+            # Another signup for the same address won the race
+            return jsonify({
+                'success': False,
+                'message': 'An account with this email already exists'
+            }), 400
         
         # Set session
         session['user_authenticated'] = True
@@ -1850,15 +2078,12 @@ def submit_onboarding():
         data = request.get_json()
         user_id = session.get('user_id')
         
-        # Load existing businesses
-        businesses = load_businesses()
-        
         # Check if user already has a business profile
-        existing_business = next((b for b in businesses if b['user_id'] == user_id), None)
+        existing_business = store.get_business_by_user(user_id, sections=())
         
         # Create or update business profile
         business_data = {
-            'id': existing_business['id'] if existing_business else len(businesses) + 1,
+            'id': existing_business['id'] if existing_business else None,
             'user_id': user_id,
             'category': data.get('category'),
             'business_name': data.get('businessName'),
@@ -1934,23 +2159,18 @@ def submit_onboarding():
             }
         }
         
-        if existing_business:
-            # Update existing business
-            businesses = [b for b in businesses if b['user_id'] != user_id]
-        
-        businesses.append(business_data)
-        save_businesses(businesses)
+        # Create or replace the business profile (new profiles get their id here)
+        business_data = store.upsert_business(business_data)
+        refresh_dashboard_view(user_id, business_data)
+        record_business_change(business_data)
         
         # Update user profile to mark onboarding as completed
-        users = load_users()
-        for i, user in enumerate(users):
-            if user['id'] == user_id:
-                users[i]['onboarding_completed'] = True
-                users[i]['profile_complete'] = True
-                users[i]['business_profile'] = business_data['id']
-                users[i]['last_activity'] = datetime.now().isoformat()
-                break
-        save_users(users)
+        store.update_user(user_id, {
+            'onboarding_completed': True,
+            'profile_complete': True,
+            'business_profile': business_data['id'],
+            'last_activity': datetime.now().isoformat()
+        })
         
         # Start background scraping process
         scraping_thread = threading.Thread(
@@ -1995,16 +2215,13 @@ def admin_dashboard_protected():
 @require_admin_auth
 def view_user_profile(user_id):
     """View detailed user profile with scraped data"""
-    users = load_users()
-    businesses = load_businesses()
-    
     # Find user
-    user = next((u for u in users if u['id'] == user_id), None)
+    user = store.get_user(user_id)
     if not user:
         return "User not found", 404
     
     # Find user's business profile
-    business = next((b for b in businesses if b['user_id'] == user_id), None)
+    business = store.get_business_by_user(user_id)
     
     return render_template('user_profile.html', user=user, business=business, admin_secret=ADMIN_SECRET)
 
@@ -2012,8 +2229,7 @@ def view_user_profile(user_id):
 @require_admin_auth
 def trigger_scraping(user_id):
     """Manually trigger data scraping for a user"""
-    businesses = load_businesses()
-    business = next((b for b in businesses if b['user_id'] == user_id), None)
+    business = store.get_business_by_user(user_id, sections=())
     
     if not business:
         return jsonify({'success': False, 'message': 'Business profile not found'}), 404
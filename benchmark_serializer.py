@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Serializer benchmark for ProfitWi$e Platform
+Measures JSON encode/decode throughput on a synthetic businesses.json
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import serializer
+
+CATEGORIES = ['technology', 'retail', 'food_service', 'healthcare', 'consulting', 'manufacturing']
+
+
+def make_business(index: int, rng: random.Random) -> dict:
+    """Build one business record shaped like the ones the onboarding flow stores"""
+    created = datetime(2025, 1, 1) + timedelta(minutes=rng.randint(0, 500000))
+    name = f"Business {index}"
+    return {
+        'id': index,
+        'user_id': index,
+        'category': rng.choice(CATEGORIES),
+        'business_name': name,
+        'website_url': f"https://business{index}.example.com",
+        'files': [],
+        'financial_data': {
+            'monthlyRevenue': str(rng.randint(1000, 500000)),
+            'directCosts': str(rng.randint(500, 200000)),
+            'operatingExpenses': str(rng.randint(500, 100000)),
+            'customerAcquisitionCost': str(rng.randint(10, 2000)),
+            'revenuePerCustomer': str(rng.randint(10, 5000)),
+            'customerRetention': str(rng.randint(10, 99)),
+            'revenueModel': rng.choice(['subscription', 'one-time', 'usage-based']),
+            'financialTools': 'QuickBooks, Stripe'
+        },
+        'onboarding_data': {
+            'business_name': name,
+            'monthly_revenue': rng.choice(['$0-10k', '$10k-50k', '$50k-100k', '$100k-500k']),
+            'revenue_per_customer': f"${rng.randint(10, 5000)}",
+            'customer_acquisition_cost': f"${rng.randint(10, 2000)}",
+            'customer_retention': f"{rng.randint(10, 99)}%",
+            'cash_flow': rng.choice(['Positive', 'Negative', 'Break-even']),
+            'profit_barriers': 'Scaling costs and hiring',
+            'cost_revenue_opportunities': 'Automation of manual reporting'
+        },
+        'scraped_data': {
+            'website': {
+                'title': f"{name} | Home",
+                'links': [f"https://business{index}.example.com/page/{n}" for n in range(20)],
+                'images': [f"https://business{index}.example.com/img/{n}.png" for n in range(10)]
+            }
+        },
+        'chat_history': [
+            {'role': rng.choice(['user', 'assistant']), 'content': 'How can I improve my margins? ' * 3,
+             'timestamp': (created + timedelta(minutes=n)).isoformat()}
+            for n in range(6)
+        ],
+        'created_at': created.isoformat(),
+        'updated_at': created.isoformat(),
+        'data_completeness': round(rng.uniform(10, 100), 2),
+        'access_count': rng.randint(0, 500)
+    }
+
+
+def measure(label: str, encode, decode, records: list, rounds: int) -> None:
+    """Time encoding and decoding the whole list and print throughput"""
+    payload = encode(records)
+    size = len(payload)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode(records)
+    encode_seconds = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode(payload)
+    decode_seconds = (time.perf_counter() - start) / rounds
+
+    megabytes = size / (1024 * 1024)
+    print(f"{label:<22} {megabytes:8.2f} MB  "
+          f"encode {megabytes / encode_seconds:8.1f} MB/s ({len(records) / encode_seconds:10.0f} rec/s)  "
+          f"decode {megabytes / decode_seconds:8.1f} MB/s ({len(records) / decode_seconds:10.0f} rec/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization of business records")
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Also write the synthetic businesses.json to this path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    records = [make_business(index, rng) for index in range(1, args.records + 1)]
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(records, f, indent=2)
+
+    print(f"{args.records} records, {args.rounds} rounds, serializer backend: {serializer.BACKEND}")
+    measure('stdlib json indent=2', lambda r: json.dumps(r, indent=2), json.loads, records, args.rounds)
+    measure('stdlib json compact', lambda r: json.dumps(r, separators=(',', ':')), json.loads, records, args.rounds)
+    measure(f'serializer ({serializer.BACKEND})', serializer.dumps_bytes, serializer.loads, records, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
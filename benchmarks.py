@@ -0,0 +1,165 @@
+"""
+Category Benchmarks for ProfitWi$e Platform
+Sorted per-category metric arrays, updated as businesses change, for O(log n) peer percentiles
+"""
+
+import time
+import threading
+import logging
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from analytics import UNCATEGORIZED, compute_metrics, load_frame
+from storage import DataStore
+
+logger = logging.getLogger(__name__)
+
+# Metrics benchmarked against peers in the same category
+BENCHMARK_METRICS = ('monthly_revenue', 'profit_margin', 'retention_rate', 'customer_acquisition_cost')
+
+# Fewer peers than this and a percentile says more about the sample than the business
+MIN_PEERS = 5
+
+
+def _metric_values(frame: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    metrics = compute_metrics(frame)
+    return {metric: metrics[metric] for metric in BENCHMARK_METRICS}
+
+
+class CategoryBenchmarks:
+    """Per-category sorted lists of each metric, plus every business's own values for updates"""
+
+    def __init__(self, store: DataStore, max_age: float = 300.0):
+        self.store = store
+        # Writes from other processes only show up on a full reload, at most once per max_age seconds
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._sorted = {}
+        self._entries = {}
+        self._version = None
+        self._loaded_at = 0.0
+        # Updates that arrive while a reload reads the store, replayed onto the new index
+        self._pending = None
+
+    def _is_fresh(self, version: int) -> bool:
+        return self._version is not None and (version == self._version or time.time() - self._loaded_at < self.max_age)
+
+    def _ensure_loaded(self) -> None:
+        version = self.store.get_version('businesses')
+        with self._lock:
+            if self._is_fresh(version):
+                return
+            first_load = self._version is None
+
+        if first_load:
+            # Nothing to answer from yet, so wait for the first load (or one already running)
+            self._reload_lock.acquire()
+            self._reload_locked(version)
+        else:
+            # Keep answering from the current index while a background thread rebuilds it
+            self._reload_in_background(version)
+
+    def _reload_locked(self, version: int) -> None:
+        """Rebuild the index if still stale; the caller holds _reload_lock and it is released here"""
+        try:
+            with self._lock:
+                if self._is_fresh(version):
+                    return
+                self._pending = {}
+            self._reload(version)
+        finally:
+            with self._lock:
+                self._pending = None
+            self._reload_lock.release()
+
+    def _reload_in_background(self, version: int) -> None:
+        if not self._reload_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._reload_locked(version)
+            except Exception as e:
+                logger.error(f"Category benchmark reload failed: {e}")
+                with self._lock:
+                    # Wait out another max_age rather than retrying on every request
+                    self._loaded_at = time.time()
+
+        threading.Thread(target=run, name='benchmarks-reload', daemon=True).start()
+
+    def start(self) -> None:
+        """Load the index on a daemon thread so the first dashboard request does not wait for it"""
+        self._reload_in_background(self.store.get_version('businesses'))
+
+    def _reload(self, version: int) -> None:
+        start = time.perf_counter()
+        frame = load_frame(self.store.iter_onboarding_data())
+        values = _metric_values(frame)
+        categories = frame['category_names'][frame['category_code']]
+
+        sorted_values, entries = {}, {}
+        for metric, column in values.items():
+            reported = ~np.isnan(column)
+            for name in np.unique(categories[reported]):
+                sorted_values[(str(name), metric)] = np.sort(column[reported & (categories == name)]).tolist()
+        for index, user_id in enumerate(frame['user_id']):
+            entries[user_id] = (str(categories[index]), {
+                metric: float(column[index]) for metric, column in values.items() if not np.isnan(column[index])
+            })
+
+        with self._lock:
+            self._sorted, self._entries = sorted_values, entries
+            self._version, self._loaded_at = version, time.time()
+            for user_id, (category, metrics) in self._pending.items():
+                self._replace(user_id, category, metrics)
+        logger.info(f"Loaded category benchmarks for {len(entries)} businesses in {time.perf_counter() - start:.3f}s")
+
+    def _replace(self, user_id: Any, category: str, metrics: Dict[str, float]) -> None:
+        old_category, old_metrics = self._entries.pop(user_id, (None, {}))
+        for metric, value in old_metrics.items():
+            values = self._sorted.get((old_category, metric), [])
+            index = bisect_left(values, value)
+            if index < len(values) and values[index] == value:
+                del values[index]
+        self._entries[user_id] = (category, metrics)
+        for metric, value in metrics.items():
+            insort(self._sorted.setdefault((category, metric), []), value)
+
+    def update(self, business: Optional[Dict]) -> None:
+        """Replace one business's values in the index after its onboarding data changed"""
+        if not business:
+            return
+        user_id = business.get('user_id')
+        category = business.get('category') or UNCATEGORIZED
+        frame = load_frame([(user_id, category, business.get('onboarding_data') or {})])
+        metrics = {
+            metric: float(column[0]) for metric, column in _metric_values(frame).items() if not np.isnan(column[0])
+        }
+        with self._lock:
+            if self._pending is not None:
+                self._pending[user_id] = (category, metrics)
+            if self._version is not None:
+                self._replace(user_id, category, metrics)
+
+    def percentiles(self, user_id: Any) -> Optional[Dict[str, Any]]:
+        """Where each of a business's metrics ranks within its category, or None if it is not indexed"""
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            category, metrics = entry
+            result = {}
+            for metric in BENCHMARK_METRICS:
+                values = self._sorted.get((category, metric), [])
+                value = metrics.get(metric)
+                percentile = None
+                if value is not None and len(values) >= MIN_PEERS:
+                    below = bisect_left(values, value)
+                    equal = bisect_right(values, value) - below
+                    percentile = round((below + equal / 2) / len(values) * 100, 1)
+                result[metric] = {'value': value, 'percentile': percentile, 'peers': len(values)}
+            return {'category': category, 'metrics': result}
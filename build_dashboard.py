@@ -8,6 +8,8 @@ import os
 import subprocess
 import sys
 
+from compression import precompress_directory
+
 def build_dashboard():
     """Build the Next.js dashboard for static export"""
     print("Building Next.js dashboard...")
@@ -24,6 +26,9 @@ def build_dashboard():
         print("Building for static export...")
         subprocess.run(['npm', 'run', 'build'], check=True)
         
+        # Ship .gz/.br siblings so Flask can serve assets without compressing per request
+        precompress_directory(os.path.join('out', '_next'))
+        
         print("Dashboard build completed successfully!")
         return True
         
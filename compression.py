@@ -0,0 +1,165 @@
+"""
+Response Compression for ProfitWi$e Platform
+Negotiates gzip or brotli from Accept-Encoding for dynamic responses and serves precompressed static assets
+"""
+
+import os
+import sys
+import zlib
+import mimetypes
+import argparse
+import logging
+from typing import Iterable, Iterator, List, Optional, Union
+
+from flask import Flask, Response, current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'text/css', 'text/html', 'text/javascript', 'text/plain', 'text/xml'
+}
+
+# Precompressed variant suffixes, in the order the server prefers them
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+PRECOMPRESS_EXTENSIONS = ('.js', '.css', '.html', '.json', '.svg', '.txt', '.map')
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce on the fly, preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(candidates: List[str] = None) -> Optional[str]:
+    """Pick the best encoding the current request accepts, or None for identity"""
+    return request.accept_encodings.best_match(candidates or available_encodings())
+
+
+def _compressor(encoding: str, level: int):
+    if encoding == 'br':
+        return brotli.Compressor(quality=min(level, 11))
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def compress_stream(chunks: Iterable[Union[str, bytes]], encoding: str = 'gzip', level: int = 6) -> Iterator[bytes]:
+    """Compress a stream of chunks incrementally"""
+    compressor = _compressor(encoding, level)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.process(chunk) if encoding == 'br' else compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish() if encoding == 'br' else compressor.flush()
+
+
+def compress_bytes(data: bytes, encoding: str = 'gzip', level: int = 6) -> bytes:
+    """Compress a complete payload"""
+    return b''.join(compress_stream([data], encoding, level))
+
+
+def init_compression(app: Flask, min_size: int = 1024, level: int = 6) -> None:
+    """Compress eligible responses according to the request's Accept-Encoding"""
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if (request.method == 'HEAD' or not 200 <= response.status_code < 300 or response.status_code == 204
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.iter_encoded(), encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            compressed = compress_bytes(data, encoding, level)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from what a strong validator promised, so weaken it;
+        # If-None-Match compares weakly, so clients still get 304s
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def send_precompressed(directory: str, filename: str) -> Response:
+    """Serve a static file, preferring a precompressed .br or .gz sibling the client accepts"""
+    # send_from_directory resolves relative paths against the app root, so check files the same way
+    directory = os.path.join(current_app.root_path, directory)
+    candidates = []
+    for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+        path = safe_join(directory, filename + suffix)
+        if path is not None and os.path.isfile(path):
+            candidates.append(encoding)
+
+    encoding = negotiate_encoding(candidates) if candidates else None
+    if encoding is None:
+        response = send_from_directory(directory, filename)
+    else:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(directory, filename + PRECOMPRESSED_SUFFIXES[encoding], mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def precompress_directory(directory: str, min_size: int = 1024) -> int:
+    """Write maximum-compression .gz (and .br when available) siblings for static assets"""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            variants = {'gzip': compress_bytes(data, 'gzip', 9)}
+            if brotli is not None:
+                variants['br'] = brotli.compress(data, quality=11)
+            for encoding, compressed in variants.items():
+                if len(compressed) < len(data):
+                    with open(path + PRECOMPRESSED_SUFFIXES[encoding], 'wb') as f:
+                        f.write(compressed)
+                    written += 1
+    logger.info(f"Precompressed {written} asset variants in {directory}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProfitWi$e static asset precompression")
+    parser.add_argument('directory', nargs='?', default='dashboard/out/_next')
+    parser.add_argument('--min-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"{args.directory} does not exist; build the dashboard first")
+        sys.exit(1)
+    count = precompress_directory(args.directory, args.min_size)
+    print(f"Wrote {count} precompressed files under {args.directory}")
+    if brotli is None:
+        print("brotli is not installed; only .gz variants were written")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,20 +22,24 @@ import { ActivityChart } from "@/components/activity-chart"
 import { TopProducts } from "@/components/top-products"
 import { SettingsPage } from "@/components/settings-page"
 import { AIAnalysisDisplay } from "@/components/ai-analysis-display"
+import type { DashboardData } from "@/lib/data-service"
 
 export default function Dashboard() {
   const [activeSection, setActiveSection] = useState("Overview")
   const [isLoading, setIsLoading] = useState(true)
+  const [dashboardData, setDashboardData] = useState<DashboardData | null>(null)
   const { debouncedSave, loadState } = usePersistence()
 
-  // Load saved state on mount
+  // Load saved state and dashboard data in one bootstrap call on mount
   useEffect(() => {
     const loadSavedState = async () => {
       try {
-        const savedState = await loadState()
+        const bootstrap = await loadState()
+        const savedState = bootstrap?.dashboard_state
         if (savedState?.dashboard_state) {
           setActiveSection(savedState.dashboard_state.active_section || "Overview")
         }
+        setDashboardData(bootstrap?.dashboard_data ?? null)
       } catch (error) {
         console.error('Failed to load saved state:', error)
       } finally {
@@ -66,7 +70,7 @@ export default function Dashboard() {
       case "Overview":
         return (
           <div className="space-y-6">
-            <BusinessHealthOverview />
+            <BusinessHealthOverview initialData={dashboardData} />
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
               <MetricsOverview />
               <RevenueChart />
@@ -118,7 +122,7 @@ export default function Dashboard() {
       default:
         return (
           <div className="space-y-6">
-            <BusinessHealthOverview />
+            <BusinessHealthOverview initialData={dashboardData} />
             <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
               <MetricsOverview />
               <RevenueChart />
@@ -7,11 +7,20 @@ import { Badge } from "@/components/ui/badge"
 import { TrendingUp, DollarSign, Users, AlertTriangle, Loader2 } from "lucide-react"
 import { dataService, type DashboardData } from "@/lib/data-service"
 
-export function BusinessHealthOverview() {
-  const [data, setData] = useState<DashboardData | null>(null)
-  const [loading, setLoading] = useState(true)
+interface BusinessHealthOverviewProps {
+  // Data the page already loaded; fetched here only when it is missing
+  initialData?: DashboardData | null
+}
+
+export function BusinessHealthOverview({ initialData }: BusinessHealthOverviewProps) {
+  const [data, setData] = useState<DashboardData | null>(initialData ?? null)
+  const [loading, setLoading] = useState(!initialData)
 
   useEffect(() => {
+    if (initialData) {
+      return
+    }
+
     const fetchData = async () => {
       try {
         const dashboardData = await dataService.fetchDashboardData()
@@ -24,7 +33,7 @@ export function BusinessHealthOverview() {
     }
 
     fetchData()
-  }, [])
+  }, [initialData])
 
   if (loading) {
     return (
@@ -1,6 +1,6 @@
 "use client"
 
-import { useState } from "react"
+import { useState, useEffect } from "react"
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
 import { Button } from "@/components/ui/button"
@@ -42,6 +42,7 @@ import {
   CheckCircle,
   XCircle
 } from "lucide-react"
+import { dataService, type CashForecast } from "@/lib/data-service"
 
 const cashFlowData = [
   { 
@@ -174,8 +175,29 @@ const cashFlowMetrics = {
   cashRunway: 8.5
 }
 
+// Median and 10th/90th percentile cash balance per forecast month, in the projection chart's shape
+function forecastProjections(forecast: CashForecast) {
+  return forecast.balance.p50.map((projected, index) => ({
+    month: `+${index + 1}m`,
+    projected,
+    optimistic: forecast.balance.p90[index],
+    pessimistic: forecast.balance.p10[index]
+  }))
+}
+
 export function CashFlowAnalysis() {
   const [activeView, setActiveView] = useState<"overview" | "projections" | "working-capital" | "statements">("overview")
+  const [forecast, setForecast] = useState<CashForecast | null>(null)
+
+  // The Monte Carlo forecast is only fetched once the projections view is opened
+  useEffect(() => {
+    if (activeView !== "projections" || forecast) {
+      return
+    }
+    dataService.getForecast({ months: 12 }).then(setForecast)
+  }, [activeView, forecast])
+
+  const shortfall = forecast?.shortfall_probability['12m']
 
   return (
     <div className="space-y-6">
@@ -337,7 +359,7 @@ export function CashFlowAnalysis() {
               <h4 className="font-semibold">Cash Flow Projections</h4>
         <div className="h-64">
           <ResponsiveContainer width="100%" height="100%">
-                  <LineChart data={[...cashFlowData, ...cashFlowProjections]}>
+                  <LineChart data={forecast ? forecastProjections(forecast) : [...cashFlowData, ...cashFlowProjections]}>
               <CartesianGrid strokeDasharray="3 3" className="stroke-muted" />
               <XAxis dataKey="month" className="text-xs" />
               <YAxis className="text-xs" />
@@ -359,19 +381,29 @@ export function CashFlowAnalysis() {
 
               <div className="grid grid-cols-1 lg:grid-cols-3 gap-4">
                 <div className="p-4 rounded-lg bg-muted/30">
-                  <h5 className="font-medium mb-2">Q4 Projection</h5>
-                  <p className="text-2xl font-bold text-green-600">$33K</p>
+                  <h5 className="font-medium mb-2">{forecast ? "Monthly Net" : "Q4 Projection"}</h5>
+                  <p className="text-2xl font-bold text-green-600">
+                    {forecast ? `$${(forecast.expected_monthly_net / 1000).toFixed(1)}K` : "$33K"}
+                  </p>
                   <p className="text-xs text-muted-foreground">Expected net cash flow</p>
                 </div>
                 <div className="p-4 rounded-lg bg-muted/30">
-                  <h5 className="font-medium mb-2">Confidence Level</h5>
-                  <p className="text-2xl font-bold text-blue-600">85%</p>
-                  <p className="text-xs text-muted-foreground">Average confidence</p>
+                  <h5 className="font-medium mb-2">{forecast ? "Median Runway" : "Confidence Level"}</h5>
+                  <p className="text-2xl font-bold text-blue-600">
+                    {forecast
+                      ? (forecast.runway_months.p50 === null ? `${forecast.months}+ mo` : `${forecast.runway_months.p50} mo`)
+                      : "85%"}
+                  </p>
+                  <p className="text-xs text-muted-foreground">{forecast ? "Months until cash runs out" : "Average confidence"}</p>
                 </div>
                 <div className="p-4 rounded-lg bg-muted/30">
                   <h5 className="font-medium mb-2">Risk Assessment</h5>
-                  <p className="text-2xl font-bold text-orange-600">Medium</p>
-                  <p className="text-xs text-muted-foreground">Projection risk level</p>
+                  <p className="text-2xl font-bold text-orange-600">
+                    {shortfall === undefined ? "Medium" : `${Math.round(shortfall * 100)}%`}
+                  </p>
+                  <p className="text-xs text-muted-foreground">
+                    {shortfall === undefined ? "Projection risk level" : "Chance of a cash shortfall within 12 months"}
+                  </p>
                 </div>
               </div>
             </div>
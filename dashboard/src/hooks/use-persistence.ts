@@ -1,7 +1,7 @@
 "use client"
 
 import { useEffect, useCallback, useRef } from 'react'
-import { dataService } from '@/lib/data-service'
+import { dataService, DashboardBootstrap, DashboardPatchResult } from '@/lib/data-service'
 
 interface PersistenceState {
   activeSection: string
@@ -14,26 +14,80 @@ interface PersistenceState {
   settings: Record<string, any>
 }
 
+// Field names the server stores dashboard_state under
+const STATE_FIELDS: Record<keyof PersistenceState, string> = {
+  activeSection: 'active_section',
+  userPreferences: 'user_preferences',
+  viewedSections: 'viewed_sections',
+  interactions: 'interactions',
+  bookmarks: 'bookmarks',
+  notes: 'notes',
+  filters: 'filters',
+  settings: 'settings'
+}
+
+function toServerState(state: Partial<PersistenceState>): Record<string, any> {
+  const serverState: Record<string, any> = {}
+  for (const [key, value] of Object.entries(state)) {
+    if (value !== undefined) {
+      serverState[STATE_FIELDS[key as keyof PersistenceState] ?? key] = value
+    }
+  }
+  return serverState
+}
+
+function changedFields(previous: Record<string, any>, next: Record<string, any>): Record<string, any> {
+  const delta: Record<string, any> = {}
+  for (const [key, value] of Object.entries(next)) {
+    if (JSON.stringify(previous[key]) !== JSON.stringify(value)) {
+      delta[key] = value
+    }
+  }
+  return delta
+}
+
 export function usePersistence() {
   const saveTimeoutRef = useRef<NodeJS.Timeout | null>(null)
   const lastSavedState = useRef<string>('')
+  // Server dashboard_version and fields our last save was based on, so autosaves can send a delta
+  const versionRef = useRef<number | null>(null)
+  const savedFields = useRef<Record<string, any>>({})
 
   const saveState = useCallback(async (state: Partial<PersistenceState>) => {
     try {
-      const stateString = JSON.stringify(state)
+      const nextState = toServerState(state)
+      const stateString = JSON.stringify(nextState)
       
       // Only save if state has changed
       if (stateString === lastSavedState.current) {
         return
       }
 
+      const delta = changedFields(savedFields.current, nextState)
+      let result: DashboardPatchResult | null = null
+      if (versionRef.current !== null) {
+        if (Object.keys(delta).length === 0) {
+          lastSavedState.current = stateString
+          return
+        }
+        result = await dataService.patchDashboardState(versionRef.current, { dashboard_state: delta })
+        if (result.conflict) {
+          // Another tab saved first; the changed fields still apply on top of its version
+          result = await dataService.patchDashboardState(result.version, { dashboard_state: delta })
+        }
+      }
+      if (!result || !result.success) {
+        // No base version yet, or still conflicting: send the whole state once
+        result = await dataService.saveDashboardState({
+          ...nextState,
+          last_updated: new Date().toISOString()
+        })
+      }
+
+      versionRef.current = result.version
+      savedFields.current = { ...savedFields.current, ...nextState }
       lastSavedState.current = stateString
       
-      await dataService.saveDashboardState({
-        ...state,
-        last_updated: new Date().toISOString()
-      })
-      
       console.log('Dashboard state saved successfully')
     } catch (error) {
       console.error('Failed to save dashboard state:', error)
@@ -52,10 +106,16 @@ export function usePersistence() {
     }, 1000) // Save after 1 second of inactivity
   }, [saveState])
 
-  const loadState = useCallback(async () => {
+  // Loads the saved state together with the dashboard data in one round trip for first paint
+  const loadState = useCallback(async (): Promise<DashboardBootstrap | null> => {
     try {
-      const savedState = await dataService.getDashboardState()
-      return savedState
+      const bootstrap = await dataService.getDashboardBootstrap(['dashboard_data', 'dashboard_state'])
+      const savedState = bootstrap?.dashboard_state
+      if (savedState) {
+        versionRef.current = savedState.version ?? null
+        savedFields.current = savedState.dashboard_state ?? {}
+      }
+      return bootstrap
     } catch (error) {
       console.error('Failed to load dashboard state:', error)
       return null
@@ -77,12 +77,30 @@ export interface BusinessAlert {
   type: 'warning' | 'info' | 'success' | 'error'
   title: string
   message: string
+  rule?: string
 }
 
 export interface BusinessRecommendation {
   category: string
   title: string
   description: string
+  rule?: string
+}
+
+export interface MetricBenchmark {
+  value: number | null
+  percentile: number | null
+  peers: number
+}
+
+export interface CategoryBenchmarks {
+  category: string
+  metrics: {
+    monthly_revenue: MetricBenchmark
+    profit_margin: MetricBenchmark
+    retention_rate: MetricBenchmark
+    customer_acquisition_cost: MetricBenchmark
+  }
 }
 
 export interface DashboardData {
@@ -97,6 +115,44 @@ export interface DashboardData {
   health_score: number
   alerts: BusinessAlert[]
   recommendations: BusinessRecommendation[]
+  benchmarks?: CategoryBenchmarks | null
+}
+
+export interface CashForecast {
+  months: number
+  paths: number
+  shortfall_probability: Record<string, number>
+  runway_months: { p10: number | null; p50: number | null; p90: number | null }
+  balance: { p10: number[]; p50: number[]; p90: number[] }
+  expected_monthly_net: number
+  inputs: Record<string, any> & { assumptions: string[] }
+  input_hash: string
+  compute_ms: number
+}
+
+// Sections of /api/dashboard-bootstrap; only the requested ones are present
+export interface DashboardBootstrap {
+  dashboard_data?: DashboardData
+  dashboard_state?: any
+  ai_insights?: any
+}
+
+// Incremental dashboard save: dicts carry only changed keys (null removes one), list items upsert by id
+export interface DashboardStateDelta {
+  dashboard_state?: Record<string, any>
+  analytics?: Record<string, any>
+  extracted_data?: Record<string, any>
+  reports?: any[]
+  alerts?: any[]
+  chat_history?: any[]
+}
+
+export interface DashboardPatchResult {
+  success: boolean
+  version: number
+  timestamp?: string
+  // Set when the base version was stale; version is then the server's current version
+  conflict?: boolean
 }
 
 class DataService {
@@ -179,6 +235,33 @@ class DataService {
     }
   }
 
+  async patchDashboardState(version: number, delta: DashboardStateDelta): Promise<DashboardPatchResult> {
+    try {
+      const response = await fetch(`${this.baseUrl}/api/save-dashboard-state`, {
+        method: 'PATCH',
+        credentials: 'include',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ version, ...delta }),
+      })
+
+      if (response.status === 409) {
+        const body = await response.json()
+        return { success: false, conflict: true, version: body.details?.current_version ?? version }
+      }
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      console.error('Error patching dashboard state:', error)
+      throw error
+    }
+  }
+
   async getDashboardState(): Promise<any> {
     try {
       const response = await fetch(`${this.baseUrl}/api/get-dashboard-state`, {
@@ -263,6 +346,54 @@ class DataService {
     }, context, 2) // Reduced retries for AI calls
   }
 
+  async getDashboardBootstrap(sections?: Array<keyof DashboardBootstrap>): Promise<DashboardBootstrap | null> {
+    try {
+      const query = sections && sections.length ? `?sections=${sections.join(',')}` : ''
+      const response = await fetch(`${this.baseUrl}/api/dashboard-bootstrap${query}`, {
+        method: 'GET',
+        credentials: 'include',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      })
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      console.error('Error getting dashboard bootstrap:', error)
+      return null
+    }
+  }
+
+  async getForecast(options: { months?: number; paths?: number; cashOnHand?: number } = {}): Promise<CashForecast | null> {
+    try {
+      const params = new URLSearchParams()
+      if (options.months !== undefined) params.set('months', String(options.months))
+      if (options.paths !== undefined) params.set('paths', String(options.paths))
+      if (options.cashOnHand !== undefined) params.set('cash_on_hand', String(options.cashOnHand))
+      const query = params.toString() ? `?${params.toString()}` : ''
+      const response = await fetch(`${this.baseUrl}/api/forecast${query}`, {
+        method: 'GET',
+        credentials: 'include',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      })
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      console.error('Error getting forecast:', error)
+      return null
+    }
+  }
+
   async getAIInsights(): Promise<any> {
     try {
       const response = await fetch(`${this.baseUrl}/api/ai-insights`, {
@@ -115,6 +115,17 @@ class RateLimitError(ProfitWiseError):
             details={"retry_after": retry_after, **(details or {})}
         )
 
+class ConflictError(ProfitWiseError):
+    """Raised when a write is based on data that has since changed"""
+    def __init__(self, message: str = "Data was changed by another request", current_version: int = None,
+                 details: Dict = None):
+        super().__init__(
+            message=message,
+            error_code="CONFLICT_ERROR",
+            status_code=409,
+            details={"current_version": current_version, **(details or {})}
+        )
+
 def handle_errors(func: Callable) -> Callable:
     """Decorator to handle errors in Flask routes"""
     @functools.wraps(func)
@@ -331,6 +342,8 @@ def get_user_friendly_message(error: Exception) -> str:
         return "AI analysis is temporarily unavailable. Please try again later."
     elif isinstance(error, RateLimitError):
         return "Too many requests. Please wait a moment before trying again."
+    elif isinstance(error, ConflictError):
+        return "Your changes were made against an older copy. Please refresh and try again."
     else:
         return "Something went wrong. Please try again or contact support if the problem persists."
 
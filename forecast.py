@@ -0,0 +1,262 @@
+"""
+Cash Flow Forecasting for ProfitWi$e Platform
+Vectorized Monte Carlo simulation of monthly cash balances for runway and shortfall probabilities
+"""
+
+import sys
+import hashlib
+import argparse
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import serializer
+from parsers import (RETENTION_OPTION_MONTHS, parse_cash_flow, parse_currency, parse_debts, parse_monthly_churn,
+                     parse_range, parse_revenue_range)
+
+logger = logging.getLogger(__name__)
+
+# Bump when the simulation changes so cached results are not reused
+MODEL_VERSION = 3
+
+# Peak-to-average swing of inflow for each onboarding seasonality answer
+SEASONALITY_AMPLITUDE = {'high': 0.30, 'moderate': 0.15, 'low': 0.05}
+DEFAULT_SEASONALITY_AMPLITUDE = 0.10
+
+# Monthly chance of a 25% outflow spike for each cash_shortages answer
+SHORTAGE_PROBABILITY = {'never': 0.0, 'rarely': 0.02, 'sometimes': 0.05, 'often': 0.10}
+DEFAULT_SHORTAGE_PROBABILITY = 0.03
+SHORTAGE_SPIKE = 0.25
+
+BASE_REVENUE_VOLATILITY = 0.05
+# Monthly log-volatility of inflow never exceeds this, however wide the stated revenue range
+MAX_REVENUE_VOLATILITY = 0.20
+# Share of last month's deviation from the expected level that carries into the next month
+REVENUE_PERSISTENCE = 0.6
+# Share of churned revenue assumed to be won back by new customers; the rest is lost for good
+CHURN_REPLACEMENT = 0.5
+COST_VOLATILITY = 0.03
+DEFAULT_DEBT_RATE = 8.0
+
+# Without a stated balance the business is assumed to hold this many months of outflow
+DEFAULT_RESERVE_MONTHS = 3
+
+SHORTFALL_HORIZONS = (3, 6, 12, 24)
+PERCENTILES = (10, 50, 90)
+
+
+def forecast_inputs(onboarding_data: Dict[str, Any], cash_on_hand: Optional[float] = None) -> Dict[str, Any]:
+    """Turn onboarding answers into the simulation's parameters, noting each assumption made"""
+    assumptions = []
+    cash_flow = parse_cash_flow(onboarding_data.get('cash_flow', ''))
+    monthly_revenue = parse_revenue_range(onboarding_data.get('monthly_revenue', ''))
+    costs = (parse_currency(onboarding_data.get('direct_costs', ''))
+             + parse_currency(onboarding_data.get('operating_expenses', '')))
+
+    debts = parse_debts(onboarding_data.get('debt_loans', ''))
+    debt_interest = sum(principal * (rate if rate is not None else DEFAULT_DEBT_RATE) / 100 / 12
+                        for principal, rate in debts)
+    if any(rate is None for _, rate in debts):
+        assumptions.append(f"Debts without a stated rate are charged {DEFAULT_DEBT_RATE}% a year")
+
+    inflow = cash_flow['in']
+    if not inflow:
+        inflow = monthly_revenue
+        assumptions.append("Monthly inflow is taken from monthly revenue")
+    outflow = cash_flow['out']
+    if not outflow:
+        # Stated outflow already includes debt payments; cost answers do not
+        outflow = costs + debt_interest
+        assumptions.append("Monthly outflow is direct costs plus operating expenses plus debt interest")
+
+    # A revenue range such as "$10k-50k" widens the month-to-month spread, up to a cap
+    revenue_volatility = BASE_REVENUE_VOLATILITY
+    bounds = parse_range(onboarding_data.get('monthly_revenue', ''))
+    if bounds and sum(bounds) > 0:
+        revenue_volatility += (bounds[1] - bounds[0]) / sum(bounds) / 2
+    revenue_volatility = min(revenue_volatility, MAX_REVENUE_VOLATILITY)
+
+    # Customer churn becomes a steady monthly decay of inflow, net of churn won back
+    churn = parse_monthly_churn(onboarding_data.get('customer_retention', ''))
+    if churn is None:
+        monthly_churn = 0.0
+        assumptions.append("Retention unknown; inflow is not reduced for churn")
+    else:
+        monthly_churn = churn * (1 - CHURN_REPLACEMENT)
+        assumptions.append(f"Losing {churn:.1%} of customers a month shrinks inflow {monthly_churn:.1%} a month, "
+                           f"assuming new customers replace {CHURN_REPLACEMENT:.0%} of churned revenue")
+
+    seasonality = (onboarding_data.get('seasonality') or '').lower()
+    shortages = (onboarding_data.get('cash_shortages') or '').lower()
+
+    if cash_on_hand is None:
+        cash_on_hand = DEFAULT_RESERVE_MONTHS * outflow
+        assumptions.append(f"Starting cash assumed to be {DEFAULT_RESERVE_MONTHS} months of outflow")
+
+    return {
+        'cash_on_hand': round(float(cash_on_hand), 2),
+        'monthly_inflow': float(inflow),
+        'monthly_outflow': float(outflow),
+        'debt_interest': round(debt_interest, 2),
+        'revenue_volatility': round(revenue_volatility, 4),
+        'monthly_churn': round(monthly_churn, 6),
+        'seasonality_amplitude': SEASONALITY_AMPLITUDE.get(seasonality, DEFAULT_SEASONALITY_AMPLITUDE),
+        'shortage_probability': SHORTAGE_PROBABILITY.get(shortages, DEFAULT_SHORTAGE_PROBABILITY),
+        'assumptions': assumptions
+    }
+
+
+def input_hash(inputs: Dict[str, Any], months: int, paths: int) -> str:
+    """Stable hash of everything a forecast depends on"""
+    key = serializer.dumps_bytes({'model': MODEL_VERSION, 'inputs': inputs, 'months': months, 'paths': paths},
+                                 sort_keys=True)
+    return hashlib.sha256(key).hexdigest()[:32]
+
+
+def simulate(inputs: Dict[str, Any], months: int = 24, paths: int = 5000, seed: int = 0) -> Dict[str, Any]:
+    """Simulate cash balance paths and summarize runway and shortfall risk"""
+    rng = np.random.default_rng(seed)
+    shape = (paths, months)
+    t = np.arange(1, months + 1)
+
+    # Inflow deviates from its expected level by mean-reverting (AR(1)) log noise, so paths
+    # wander around the stated level instead of drifting off (float32 keeps draws cheap)
+    volatility = inputs['revenue_volatility']
+    noise = rng.standard_normal(shape, dtype=np.float32)
+    noise *= volatility
+    for month in range(1, months):
+        noise[:, month] += REVENUE_PERSISTENCE * noise[:, month - 1]
+    # Subtracting half the variance keeps each month's mean on the expected level
+    variance = volatility ** 2 * (1 - REVENUE_PERSISTENCE ** (2 * t)) / (1 - REVENUE_PERSISTENCE ** 2)
+    noise -= (variance / 2).astype(np.float32)
+    inflow = np.exp(noise, out=noise)
+    inflow *= ((1 - inputs['monthly_churn']) ** t).astype(np.float32)
+
+    # ...with a seasonal cycle whose peak month is unknown, so each path draws one
+    cycle = 1 + inputs['seasonality_amplitude'] * np.sin(2 * np.pi * (t[None, :] + np.arange(12)[:, None]) / 12)
+    inflow *= cycle.astype(np.float32)[rng.integers(0, 12, paths)]
+    inflow *= inputs['monthly_inflow']
+
+    outflow = rng.standard_normal(shape, dtype=np.float32)
+    outflow *= COST_VOLATILITY
+    outflow += 1
+    outflow += SHORTAGE_SPIKE * (rng.random(shape, dtype=np.float32) < inputs['shortage_probability'])
+    outflow *= inputs['monthly_outflow']
+
+    net = inflow - outflow
+    balance = np.cumsum(net, axis=1, dtype=np.float64)
+    balance += inputs['cash_on_hand']
+
+    # Runway is the first month a path goes negative; paths that never do outlast the horizon
+    short = balance < 0
+    ever_short = short.any(axis=1)
+    runway = np.where(ever_short, short.argmax(axis=1) + 1, months + 1)
+
+    runway_percentiles = {}
+    for p, value in zip(PERCENTILES, np.percentile(runway, PERCENTILES, method='lower')):
+        runway_percentiles[f'p{p}'] = int(value) if value <= months else None
+    return {
+        'months': months,
+        'paths': paths,
+        'shortfall_probability': {
+            f'{horizon}m': round(float((runway <= horizon).mean()), 4)
+            for horizon in SHORTFALL_HORIZONS if horizon <= months
+        },
+        'runway_months': runway_percentiles,
+        'balance': {
+            f'p{p}': [round(float(v), 2) for v in values]
+            for p, values in zip(PERCENTILES, np.percentile(balance, PERCENTILES, axis=0))
+        },
+        'expected_monthly_net': round(float(net.mean(dtype=np.float64)), 2)
+    }
+
+
+class Forecaster:
+    """Run forecasts, caching each serialized result by the hash of its inputs"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def forecast_json(self, onboarding_data: Dict[str, Any], months: int = 24, paths: int = 5000,
+                      cash_on_hand: Optional[float] = None) -> str:
+        """Forecast a business and return the result as JSON text"""
+        inputs = forecast_inputs(onboarding_data, cash_on_hand)
+        key = input_hash(inputs, months, paths)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        start = time.perf_counter()
+        # Seeding from the hash makes a forecast reproducible for the same inputs
+        result = simulate(inputs, months, paths, seed=int(key[:16], 16))
+        result.update({
+            'inputs': inputs,
+            'input_hash': key,
+            'compute_ms': round((time.perf_counter() - start) * 1000, 2)
+        })
+        payload = serializer.dumps(result)
+
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'entries': len(self._entries)
+        }
+
+
+def run_checks() -> List[str]:
+    """Check that each onboarding retention option decays inflow at its expected churn, longest-lived slowest"""
+    failures = []
+    churns = []
+    for option, months in RETENTION_OPTION_MONTHS.items():
+        inputs = forecast_inputs({'monthly_revenue': '$50,000', 'customer_retention': option}, cash_on_hand=0)
+        expected = round(1 / months * (1 - CHURN_REPLACEMENT), 6)
+        if inputs['monthly_churn'] != expected:
+            failures.append(f"{option}: monthly_churn {inputs['monthly_churn']}, expected {expected}")
+        churns.append(inputs['monthly_churn'])
+    if churns != sorted(churns, reverse=True):
+        failures.append(f"longer retention options must churn less: {churns}")
+    if forecast_inputs({'customer_retention': ''})['monthly_churn'] != 0:
+        failures.append("unknown retention must not decay inflow")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProfitWi$e cash flow forecast")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('check', help="Check the forecast inputs derived from onboarding answers")
+
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        failures = run_checks()
+        for failure in failures:
+            print(f"FAIL {failure}")
+        print("Forecast input checks " + ("failed" if failures else "passed"))
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
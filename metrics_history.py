@@ -0,0 +1,200 @@
+"""
+Metrics History for ProfitWi$e Platform
+Appends compact per-business metric snapshots and keeps daily, weekly and monthly rollups with bounded retention
+"""
+
+import os
+import math
+import time
+import argparse
+import threading
+import logging
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analytics import compute_metrics, load_frame
+from storage import DataStore
+
+logger = logging.getLogger(__name__)
+
+HISTORY_METRICS = ('monthly_revenue', 'profit_margin', 'health_score', 'net_cash_flow', 'retention_rate', 'access_count')
+
+# How long each resolution is kept; raw holds every snapshot as taken
+RETENTION = {
+    'raw': timedelta(days=2),
+    'day': timedelta(days=180),
+    'week': timedelta(days=730),
+    'month': timedelta(days=1825)
+}
+
+# /api/metrics-history ranges and the resolution each one reads
+RANGES = {
+    '48h': (timedelta(hours=48), 'raw'),
+    '7d': (timedelta(days=7), 'day'),
+    '30d': (timedelta(days=30), 'day'),
+    '90d': (timedelta(days=90), 'day'),
+    '1y': (timedelta(days=365), 'week'),
+    '2y': (timedelta(days=730), 'week'),
+    '5y': (timedelta(days=1825), 'month')
+}
+
+# Each bucket is one float64 array: per-metric sums, then reported counts, then the latest values
+_WIDTH = len(HISTORY_METRICS)
+
+
+def bucket_start(resolution: str, moment: datetime) -> int:
+    """Epoch seconds of the start of the bucket holding moment"""
+    if resolution == 'raw':
+        return int(moment.timestamp())
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == 'week':
+        day -= timedelta(days=day.weekday())
+    elif resolution == 'month':
+        day = day.replace(day=1)
+    return int(day.timestamp())
+
+
+def snapshot_values(businesses: List[Dict]) -> List[Tuple[Any, List[float]]]:
+    """Compute (user_id, HISTORY_METRICS values) for businesses in one vectorized pass; NaN means not reported"""
+    if not businesses:
+        return []
+    frame = load_frame((b.get('user_id'), b.get('category'), b.get('onboarding_data') or {}) for b in businesses)
+    metrics = compute_metrics(frame)
+    metrics['access_count'] = np.array([float(b.get('access_count') or 0) for b in businesses])
+    matrix = np.column_stack([metrics[name] for name in HISTORY_METRICS])
+    return [(business.get('user_id'), matrix[index].tolist()) for index, business in enumerate(businesses)]
+
+
+def _fold(data: Optional[bytes], values: List[float]) -> bytes:
+    series = array('d')
+    if data:
+        series.frombytes(data)
+    if len(series) != 3 * _WIDTH:
+        series = array('d', [0.0] * (2 * _WIDTH) + [math.nan] * _WIDTH)
+    for index, value in enumerate(values):
+        if not math.isnan(value):
+            series[index] += value
+            series[_WIDTH + index] += 1
+            series[2 * _WIDTH + index] = value
+    return series.tobytes()
+
+
+class MetricsHistory:
+    """Per-business metric time series in the store, rolled up by day, week and month"""
+
+    def __init__(self, store: DataStore, retention: Dict[str, timedelta] = None):
+        self.store = store
+        self.retention = retention or RETENTION
+        self._thread = None
+
+    def record(self, businesses: List[Dict], moment: datetime = None) -> int:
+        """Fold a snapshot of each business into its raw series and every rollup"""
+        moment = moment or datetime.now()
+        buckets = [(resolution, bucket_start(resolution, moment)) for resolution in self.retention]
+        snapshots = {user_id: values for user_id, values in snapshot_values(businesses) if user_id is not None}
+        keys = [(user_id, resolution, bucket) for user_id in snapshots for resolution, bucket in buckets]
+        self.store.fold_metric_series(keys, lambda key, data: _fold(data, snapshots[key[0]]))
+        return len(snapshots)
+
+    def record_all(self, batch_size: int = 1000) -> int:
+        """Snapshot every business, one transaction per batch"""
+        moment = datetime.now()
+        recorded = 0
+        batch = []
+        for business in self.store.iter_businesses(sections=()):
+            batch.append(business)
+            if len(batch) >= batch_size:
+                recorded += self.record(batch, moment)
+                batch = []
+        recorded += self.record(batch, moment)
+        logger.info(f"Recorded metric snapshots for {recorded} businesses")
+        return recorded
+
+    def prune(self, now: datetime = None) -> int:
+        """Delete buckets that have aged out of their resolution's retention"""
+        now = now or datetime.now()
+        return sum(
+            self.store.prune_metric_series(resolution, bucket_start(resolution, now - keep_for))
+            for resolution, keep_for in self.retention.items()
+        )
+
+    def series(self, user_id: Any, metric: str, range_name: str = '30d') -> Dict[str, Any]:
+        """Timestamps with the mean and latest value of one metric per bucket over a named range"""
+        if metric not in HISTORY_METRICS:
+            raise ValueError(f"Unknown metric: {metric}; expected one of {', '.join(HISTORY_METRICS)}")
+        if range_name not in RANGES:
+            raise ValueError(f"Unknown range: {range_name}; expected one of {', '.join(RANGES)}")
+        span, resolution = RANGES[range_name]
+        rows = self.store.get_metric_series(user_id, resolution, bucket_start(resolution, datetime.now() - span))
+
+        index = HISTORY_METRICS.index(metric)
+        timestamps, means, latest = [], [], []
+        for bucket, data in rows:
+            series = np.frombuffer(data, dtype=np.float64)
+            if len(series) != 3 * _WIDTH or not series[_WIDTH + index]:
+                continue
+            timestamps.append(datetime.fromtimestamp(bucket).isoformat())
+            means.append(round(float(series[index] / series[_WIDTH + index]), 2))
+            latest.append(round(float(series[2 * _WIDTH + index]), 2))
+        return {
+            'metric': metric,
+            'range': range_name,
+            'resolution': resolution,
+            'timestamps': timestamps,
+            'mean': means,
+            'last': latest
+        }
+
+    def run_once(self) -> None:
+        """Snapshot every business and apply retention"""
+        self.record_all()
+        self.prune()
+
+    def start(self, interval: float = 21600.0) -> None:
+        """Snapshot and prune periodically on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                # Wait first so restarts and extra workers do not each add a snapshot at boot
+                time.sleep(interval)
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Metric snapshot run failed: {e}")
+
+        self._thread = threading.Thread(target=run, name='metrics-history', daemon=True)
+        self._thread.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProfitWi$e metric history")
+    parser.add_argument('--db', default=os.environ.get('DATABASE_FILE', 'profitwise.db'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('snapshot', help="Record a snapshot of every business now")
+    subparsers.add_parser('prune', help="Apply the retention policy")
+    show = subparsers.add_parser('show', help="Print one business's series")
+    show.add_argument('user_id', type=int)
+    show.add_argument('--metric', default='monthly_revenue', choices=HISTORY_METRICS)
+    show.add_argument('--range', default='30d', choices=list(RANGES))
+
+    args = parser.parse_args()
+    history = MetricsHistory(DataStore(args.db))
+
+    if args.command == 'snapshot':
+        print(f"Recorded {history.record_all()} businesses")
+    elif args.command == 'prune':
+        print(f"Removed {history.prune()} buckets")
+    elif args.command == 'show':
+        series = history.series(args.user_id, args.metric, args.range)
+        for timestamp, mean, last in zip(series['timestamps'], series['mean'], series['last']):
+            print(f"{timestamp}  mean {mean:>14,.2f}  last {last:>14,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Numeric Parsers for ProfitWi$e Platform
+Precompiled, memoized parsing of the money, range and percentage strings collected during onboarding
+"""
+
+import re
+import sys
+import argparse
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# "50,000", "1.2", ".5", each optionally followed by a magnitude such as "k", "M" or "million"
+_AMOUNT = r'(\d+(?:,\d{3})*(?:\.\d+)?|\.\d+)(?:\s*(k|thousand|mm|m|million|bn|b|billion)(?![a-z]))?'
+
+AMOUNT_PATTERN = re.compile(_AMOUNT, re.IGNORECASE)
+RANGE_PATTERN = re.compile(_AMOUNT + r'\s*(?:-|–|—|to)\s*\$?\s*' + _AMOUNT, re.IGNORECASE)
+# Up to two words may sit between the amount and its direction, as in "$20k monthly in"
+CASH_FLOW_AFTER_PATTERN = re.compile(
+    r'\$?\s*' + _AMOUNT + r'(?:\s+[a-z]+){0,2}?\s*\b(in|out)(?:flow)?\b', re.IGNORECASE
+)
+CASH_FLOW_BEFORE_PATTERN = re.compile(r'\b(in|out)(?:flow)?\b\s*[:=]?\s*\$?\s*' + _AMOUNT, re.IGNORECASE)
+RATE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+# Debts are listed as "$50k loan at 8%, $10,000 credit line at 12%"; a comma inside "50,000" is not a separator
+DEBT_SPLIT_PATTERN = re.compile(r',\s+|;|\n|\band\b', re.IGNORECASE)
+
+MULTIPLIERS = {
+    'k': 1e3, 'thousand': 1e3,
+    'm': 1e6, 'mm': 1e6, 'million': 1e6,
+    'b': 1e9, 'bn': 1e9, 'billion': 1e9
+}
+
+# Expected customer lifetime in months for each answer to onboarding's "How long do customers stay?"
+RETENTION_OPTION_MONTHS = {
+    'less-than-1-year': 6,
+    '1-2-years': 18,
+    '2-5-years': 42,
+    'more-than-5-years': 84
+}
+
+CACHE_SIZE = 4096
+
+
+def _to_number(digits: str, suffix: Optional[str]) -> float:
+    value = float(digits.replace(',', ''))
+    return value * MULTIPLIERS[suffix.lower()] if suffix else value
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_range(text: str) -> Optional[Tuple[float, float]]:
+    match = RANGE_PATTERN.search(text)
+    if not match:
+        return None
+    low_digits, low_suffix, high_digits, high_suffix = match.groups()
+    # "$10-50k" means 10k to 50k, but "$500-1k" means 500 to 1,000
+    if high_suffix and not low_suffix and float(low_digits.replace(',', '')) < float(high_digits.replace(',', '')):
+        low_suffix = high_suffix
+    return _to_number(low_digits, low_suffix), _to_number(high_digits, high_suffix)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_amount(text: str) -> float:
+    match = AMOUNT_PATTERN.search(text)
+    return _to_number(*match.groups()) if match else 0.0
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_cash_flow(text: str) -> Tuple[float, float]:
+    flows = {}
+    # "$60,000 in, $45,000 out" first, then "in: $60k / out: $45k"
+    for digits, suffix, direction in CASH_FLOW_AFTER_PATTERN.findall(text):
+        flows.setdefault(direction.lower(), _to_number(digits, suffix))
+    for direction, digits, suffix in CASH_FLOW_BEFORE_PATTERN.findall(text):
+        flows.setdefault(direction.lower(), _to_number(digits, suffix))
+    return flows.get('in', 0.0), flows.get('out', 0.0)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_monthly_churn(text: str) -> Optional[float]:
+    months = RETENTION_OPTION_MONTHS.get(text.strip().lower())
+    if months is not None:
+        return 1 / months
+    # Free text such as an imported "92%" is annual retention; a number without % is not a rate
+    match = RATE_PATTERN.search(text)
+    if match is None:
+        return None
+    return 1 - (min(float(match.group(1)), 100) / 100) ** (1 / 12)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_debts(text: str) -> Tuple[Tuple[float, Optional[float]], ...]:
+    debts = []
+    for part in DEBT_SPLIT_PATTERN.split(text):
+        rate = RATE_PATTERN.search(part)
+        principal = AMOUNT_PATTERN.search(RATE_PATTERN.sub('', part))
+        if principal:
+            debts.append((_to_number(*principal.groups()), float(rate.group(1)) if rate else None))
+    return tuple(debts)
+
+
+def _text(value: Any) -> Optional[str]:
+    """Normalize an input to a cacheable string, or None when there is nothing to parse"""
+    if value is None or value == '':
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def parse_range(value: Any) -> Optional[Tuple[float, float]]:
+    """Parse a range like "$50,000 - $75,000" or "$10-50k" into (low, high)"""
+    text = _text(value)
+    return _parse_range(text) if text else None
+
+
+def parse_amount(value: Any) -> float:
+    """Parse the first amount in a string like "$50k", "1.2M" or "$12.50"""
+    text = _text(value)
+    return _parse_amount(text) if text else 0.0
+
+
+def parse_revenue_range(value: Any) -> int:
+    """Parse revenue range string to get average value"""
+    text = _text(value)
+    if not text:
+        return 0
+    bounds = _parse_range(text)
+    if bounds:
+        return int((bounds[0] + bounds[1]) // 2)
+    return int(_parse_amount(text))
+
+
+def parse_currency(value: Any) -> int:
+    """Parse currency string to get numeric value"""
+    return int(parse_amount(value))
+
+
+def parse_cash_flow(value: Any) -> Dict[str, int]:
+    """Parse cash flow string like '$60,000 in, $45,000 out'"""
+    text = _text(value)
+    cash_in, cash_out = _parse_cash_flow(text) if text else (0.0, 0.0)
+    return {
+        'in': int(cash_in),
+        'out': int(cash_out),
+        'net': int(cash_in) - int(cash_out)
+    }
+
+
+def parse_debts(value: Any) -> List[Tuple[float, Optional[float]]]:
+    """Parse listed debts into (principal, annual interest %) pairs; the rate is None when not given"""
+    text = _text(value)
+    return list(_parse_debts(text)) if text else []
+
+
+def parse_monthly_churn(value: Any) -> Optional[float]:
+    """Share of customers lost each month, from a retention option or an annual "92%"; None when unknown"""
+    text = _text(value)
+    return _parse_monthly_churn(text) if text else None
+
+
+def parse_retention_rate(value: Any) -> float:
+    """Annual customer retention as a percentage, 0 when unknown"""
+    churn = parse_monthly_churn(value)
+    return round((1 - churn) ** 12 * 100, 1) if churn is not None else 0
+
+
+PARSERS: Dict[str, Callable[[Any], Any]] = {
+    'amount': parse_amount,
+    'currency': parse_currency,
+    'revenue_range': parse_revenue_range,
+    'range': parse_range,
+    'cash_flow': parse_cash_flow,
+    'retention_rate': parse_retention_rate,
+    'monthly_churn': parse_monthly_churn,
+    'debts': parse_debts
+}
+
+
+def parse_batch(values: Iterable[Any], kind: str = 'currency') -> List[Any]:
+    """Parse many strings of one kind in a single call, e.g. a column for admin analytics"""
+    try:
+        parser = PARSERS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown parser kind: {kind}; expected one of {', '.join(PARSERS)}")
+    return [parser(value) for value in values]
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Get hit/miss counters of the memoized parsers for monitoring"""
+    caches = {
+        'range': _parse_range, 'amount': _parse_amount,
+        'cash_flow': _parse_cash_flow, 'monthly_churn': _parse_monthly_churn, 'debts': _parse_debts
+    }
+    return {name: cached.cache_info()._asdict() for name, cached in caches.items()}
+
+
+# (kind, input, expected) pairs covering the phrasings onboarding answers actually use
+CHECKS = [
+    ('amount', '$50k', 50000.0),
+    ('amount', '1.2M', 1200000.0),
+    ('amount', '$12.50', 12.5),
+    ('range', '$50,000 - $75,000', (50000.0, 75000.0)),
+    ('range', '$10-50k', (10000.0, 50000.0)),
+    ('range', '$500-1k', (500.0, 1000.0)),
+    ('revenue_range', '$10k-50k', 30000),
+    ('cash_flow', '$60,000 in, $45,000 out', {'in': 60000, 'out': 45000, 'net': 15000}),
+    ('cash_flow', 'in: $60k / out: $45k', {'in': 60000, 'out': 45000, 'net': 15000}),
+    ('cash_flow', '$60k inflow, $45k outflow', {'in': 60000, 'out': 45000, 'net': 15000}),
+    ('cash_flow', '$20k monthly in and $15k monthly out', {'in': 20000, 'out': 15000, 'net': 5000}),
+    ('cash_flow', '$5,000 per month in, $4,000 per month out', {'in': 5000, 'out': 4000, 'net': 1000}),
+    ('debts', '$50k loan at 8%, $10,000 credit line', [(50000.0, 8.0), (10000.0, None)]),
+    ('monthly_churn', 'less-than-1-year', 1 / 6),
+    ('monthly_churn', '1-2-years', 1 / 18),
+    ('monthly_churn', '2-5-years', 1 / 42),
+    ('monthly_churn', 'more-than-5-years', 1 / 84),
+    ('monthly_churn', '5 years', None),
+    ('retention_rate', 'less-than-1-year', 11.2),
+    ('retention_rate', 'more-than-5-years', 86.6),
+    ('retention_rate', '92%', 92.0),
+    ('retention_rate', '92', 0),
+]
+
+
+def run_checks() -> List[str]:
+    """Run CHECKS and describe each parser result that differs from what is expected"""
+    failures = []
+    for kind, text, expected in CHECKS:
+        actual = PARSERS[kind](text)
+        if actual != expected:
+            failures.append(f"{kind}({text!r}) = {actual!r}, expected {expected!r}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProfitWi$e onboarding parsers")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('check', help="Check the parsers against known onboarding phrasings")
+    parse = subparsers.add_parser('parse', help="Parse one value")
+    parse.add_argument('kind', choices=list(PARSERS))
+    parse.add_argument('value')
+
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        failures = run_checks()
+        for failure in failures:
+            print(f"FAIL {failure}")
+        print(f"{len(CHECKS) - len(failures)}/{len(CHECKS)} parser checks passed")
+        sys.exit(1 if failures else 0)
+    elif args.command == 'parse':
+        print(PARSERS[args.kind](args.value))
+
+
+if __name__ == "__main__":
+    main()
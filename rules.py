@@ -0,0 +1,286 @@
+"""
+Rules Engine for ProfitWi$e Platform
+Compiles declarative alert and recommendation rules once and evaluates them per business or across all businesses
+"""
+
+import os
+import time
+import zlib
+import operator
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import serializer
+from analytics import SOCIAL_FIELDS
+from parsers import parse_cash_flow, parse_currency, parse_retention_rate, parse_revenue_range
+
+logger = logging.getLogger(__name__)
+
+RULE_KINDS = ('alerts', 'recommendations')
+
+COMPARISONS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne
+}
+PREDICATES = {
+    'present': bool,
+    'missing': operator.not_
+}
+
+Condition = Callable[[Dict[str, Any], Dict[str, Any]], bool]
+
+
+class RuleError(ValueError):
+    """A rule definition that cannot be compiled"""
+
+
+def business_metrics(onboarding_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse the onboarding answers rules can refer to as metrics; None means not reported"""
+    monthly_revenue = parse_revenue_range(onboarding_data.get('monthly_revenue', ''))
+    revenue_per_customer = parse_currency(onboarding_data.get('revenue_per_customer', ''))
+    cac = parse_currency(onboarding_data.get('customer_acquisition_cost', ''))
+    direct_costs = parse_currency(onboarding_data.get('direct_costs', ''))
+    operating_expenses = parse_currency(onboarding_data.get('operating_expenses', ''))
+    cash_flow = parse_cash_flow(onboarding_data.get('cash_flow', ''))
+    costs = direct_costs + operating_expenses
+    return {
+        'monthly_revenue': monthly_revenue,
+        'revenue_per_customer': revenue_per_customer,
+        'customer_acquisition_cost': cac,
+        'direct_costs': direct_costs,
+        'operating_expenses': operating_expenses,
+        'cash_in': cash_flow['in'],
+        'cash_out': cash_flow['out'],
+        'net_cash_flow': cash_flow['net'],
+        'retention_rate': parse_retention_rate(onboarding_data.get('customer_retention', '')),
+        'profit_margin': (monthly_revenue - costs) / monthly_revenue * 100 if monthly_revenue > 0 and costs > 0 else None,
+        'cac_ratio': cac / revenue_per_customer if cac > 0 and revenue_per_customer > 0 else None,
+        'social_count': sum(1 for key in SOCIAL_FIELDS if onboarding_data.get(key))
+    }
+
+
+METRICS = frozenset(business_metrics({}))
+
+
+def compile_condition(spec: Any, path: str) -> Condition:
+    """Compile a condition tree into a function of (metrics, onboarding_data)
+
+    A condition is {"all": [...]}, {"any": [...]}, {"not": {...}}, or a test on one value:
+    {"metric": name, "op": "<", "value": 70} or {"field": name, "op": "missing"}.
+    """
+    if not isinstance(spec, dict):
+        raise RuleError(f"{path}: condition must be an object")
+
+    if 'all' in spec or 'any' in spec:
+        combine = all if 'all' in spec else any
+        key = 'all' if 'all' in spec else 'any'
+        if not isinstance(spec[key], list) or not spec[key]:
+            raise RuleError(f"{path}.{key}: expected a non-empty list of conditions")
+        parts = [compile_condition(part, f"{path}.{key}[{index}]") for index, part in enumerate(spec[key])]
+        return lambda metrics, fields: combine(part(metrics, fields) for part in parts)
+
+    if 'not' in spec:
+        inner = compile_condition(spec['not'], f"{path}.not")
+        return lambda metrics, fields: not inner(metrics, fields)
+
+    if 'metric' in spec:
+        name = spec['metric']
+        if name not in METRICS:
+            raise RuleError(f"{path}: unknown metric {name!r}; expected one of {', '.join(sorted(METRICS))}")
+        get = lambda metrics, fields: metrics[name]
+    elif 'field' in spec:
+        name = spec['field']
+        get = lambda metrics, fields: fields.get(name)
+    else:
+        raise RuleError(f"{path}: expected all, any, not, metric or field")
+
+    op = spec.get('op')
+    if op in PREDICATES:
+        predicate = PREDICATES[op]
+        return lambda metrics, fields: predicate(get(metrics, fields))
+    if 'value' not in spec:
+        raise RuleError(f"{path}: op {op!r} needs a value")
+    value = spec['value']
+    if op == 'in':
+        if not isinstance(value, list):
+            raise RuleError(f"{path}: op 'in' needs a list value")
+        choices = tuple(value)
+        return lambda metrics, fields: get(metrics, fields) in choices
+    if op not in COMPARISONS:
+        raise RuleError(f"{path}: unknown op {op!r}")
+    compare = COMPARISONS[op]
+
+    def evaluate(metrics: Dict[str, Any], fields: Dict[str, Any]) -> bool:
+        actual = get(metrics, fields)
+        if actual is None:
+            return False
+        try:
+            return compare(actual, value)
+        except TypeError:
+            return False
+    return evaluate
+
+
+class CompiledRule:
+    """One rule: its compiled condition and the output it produces when it fires"""
+
+    __slots__ = ('id', 'kind', 'condition', 'output', 'templates')
+
+    def __init__(self, spec: Dict[str, Any], kind: str, path: str):
+        if not isinstance(spec, dict) or not spec.get('id'):
+            raise RuleError(f"{path}: a rule needs an id")
+        self.id = spec['id']
+        self.kind = kind
+        self.condition = compile_condition(spec.get('when'), f"{path}.when")
+        self.output = {key: value for key, value in spec.items() if key not in ('id', 'when')}
+        self.templates = {key for key, value in self.output.items() if isinstance(value, str) and '{' in value}
+
+        # Catch templates that name unknown metrics now rather than when the rule fires
+        sample = dict.fromkeys(METRICS, 0)
+        for key in self.templates:
+            try:
+                self.output[key].format_map(sample)
+            except (KeyError, ValueError, IndexError) as e:
+                raise RuleError(f"{path}.{key}: bad template: {e}")
+
+    def render(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the alert or recommendation, filling templates from the metrics"""
+        item = {key: value.format_map(metrics) if key in self.templates else value
+                for key, value in self.output.items()}
+        item['rule'] = self.id
+        return item
+
+
+def compile_rules(definitions: Dict[str, Any]) -> Dict[str, List[CompiledRule]]:
+    """Compile rule definitions, grouped by kind, rejecting the whole set on any error"""
+    if not isinstance(definitions, dict):
+        raise RuleError("rule definitions must be an object")
+    unknown = set(definitions) - set(RULE_KINDS)
+    if unknown:
+        raise RuleError(f"unknown rule kinds: {', '.join(sorted(unknown))}")
+
+    rules, seen = {}, set()
+    for kind in RULE_KINDS:
+        rules[kind] = []
+        for index, spec in enumerate(definitions.get(kind, [])):
+            rule = CompiledRule(spec, kind, f"{kind}[{index}]")
+            if rule.id in seen:
+                raise RuleError(f"{kind}[{index}]: duplicate rule id {rule.id!r}")
+            seen.add(rule.id)
+            rules[kind].append(rule)
+    return rules
+
+
+class RuleEngine:
+    """Evaluate compiled rules, recompiling when the rules file changes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rules = {kind: [] for kind in RULE_KINDS}
+        self.version = 0
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._stats = {}
+        # A broken rules file at startup is a deployment error, so let it raise
+        self._load(os.stat(path).st_mtime_ns)
+
+    def _load(self, mtime: int) -> None:
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        rules = compile_rules(serializer.loads(raw))
+        self.rules, self.version, self._mtime = rules, zlib.crc32(raw), mtime
+        self._stats = {
+            rule.id: {'kind': rule.kind, 'evaluations': 0, 'fired': 0, 'total_ns': 0}
+            for kind in RULE_KINDS for rule in rules[kind]
+        }
+        logger.info(f"Compiled {sum(len(r) for r in rules.values())} rules from {self.path} (version {self.version})")
+
+    def refresh(self) -> bool:
+        """Recompile if the rules file changed; a file that fails to compile leaves the current rules in place"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"Cannot stat rules file {self.path}: {e}")
+            return False
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            try:
+                self._load(mtime)
+            except (OSError, ValueError) as e:
+                # Remember the mtime so a broken file is reported once, not on every request
+                self._mtime = mtime
+                logger.error(f"Keeping rules version {self.version}; {self.path} failed to compile: {e}")
+                return False
+        return True
+
+    def evaluate(self, onboarding_data: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Run every rule against one business and return the alerts and recommendations that fired"""
+        self.refresh()
+        rules = self.rules
+        metrics = business_metrics(onboarding_data)
+        results = {kind: [] for kind in RULE_KINDS}
+        timings = []
+        for kind in RULE_KINDS:
+            for rule in rules[kind]:
+                start = time.perf_counter_ns()
+                fired = rule.condition(metrics, onboarding_data)
+                timings.append((rule.id, fired, time.perf_counter_ns() - start))
+                if fired:
+                    results[kind].append(rule.render(metrics))
+
+        with self._lock:
+            for rule_id, fired, elapsed in timings:
+                stats = self._stats.get(rule_id)
+                if stats is not None:
+                    stats['evaluations'] += 1
+                    stats['fired'] += fired
+                    stats['total_ns'] += elapsed
+        return results
+
+    def evaluate_batch(self, rows: Iterable[Tuple[Any, Optional[str], Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run every rule over (user_id, category, onboarding_data) rows and report how often each fired"""
+        self.refresh()
+        rules = [rule for kind in RULE_KINDS for rule in self.rules[kind]]
+        fired = dict.fromkeys((rule.id for rule in rules), 0)
+        cost = dict.fromkeys((rule.id for rule in rules), 0)
+        businesses = 0
+        start = time.perf_counter()
+        for _, _, onboarding_data in rows:
+            metrics = business_metrics(onboarding_data)
+            businesses += 1
+            for rule in rules:
+                rule_start = time.perf_counter_ns()
+                if rule.condition(metrics, onboarding_data):
+                    fired[rule.id] += 1
+                cost[rule.id] += time.perf_counter_ns() - rule_start
+        return {
+            'businesses': businesses,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+            'rules_version': self.version,
+            'rules': [{
+                'id': rule.id,
+                'kind': rule.kind,
+                'fired': fired[rule.id],
+                'fire_rate': round(fired[rule.id] / businesses, 4) if businesses else 0.0,
+                'avg_ns': round(cost[rule.id] / businesses) if businesses else 0
+            } for rule in rules]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-rule evaluation counts, fire counts and average cost since the rules were last compiled"""
+        with self._lock:
+            return {
+                'path': self.path,
+                'version': self.version,
+                'rules': [{
+                    'id': rule_id,
+                    'kind': stats['kind'],
+                    'evaluations': stats['evaluations'],
+                    'fired': stats['fired'],
+                    'avg_ns': round(stats['total_ns'] / stats['evaluations']) if stats['evaluations'] else 0
+                } for rule_id, stats in self._stats.items()]
+            }
@@ -0,0 +1,73 @@
+"""
+JSON Serializer for ProfitWi$e Platform
+Uses orjson when it is installed and falls back to the standard library json module
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+if orjson is not None:
+    # Leave datetimes and dataclasses to the caller's default hook so both backends agree
+    _BASE_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def dumps_bytes(obj: Any, indent: bool = False, sort_keys: bool = False,
+                default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, compact unless indent is set"""
+    if orjson is not None:
+        options = _BASE_OPTIONS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=options)
+        except orjson.JSONEncodeError:
+            # Values orjson rejects (e.g. integers wider than 64 bits) still encode with stdlib
+            pass
+    return _stdlib_dumps(obj, indent, sort_keys, default).encode('utf-8')
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False,
+          default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Serialize obj to a JSON string, compact unless indent is set"""
+    if orjson is None:
+        return _stdlib_dumps(obj, indent, sort_keys, default)
+    return dumps_bytes(obj, indent, sort_keys, default).decode('utf-8')
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Deserialize JSON from text or UTF-8 bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj: Any, indent: bool, sort_keys: bool, default: Optional[Callable[[Any], Any]]) -> str:
+    if indent:
+        return json.dumps(obj, indent=2, sort_keys=sort_keys, default=default, ensure_ascii=False)
+    return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys, default=default, ensure_ascii=False)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that routes jsonify and request.get_json through the serializer"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if set(kwargs) - {'indent', 'separators'}:
+            # Callers asking for stdlib-specific options get the stdlib behaviour
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, indent=bool(kwargs.get('indent')), sort_keys=self.sort_keys, default=self.default)
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
@@ -0,0 +1,193 @@
+"""
+Snapshot Manager for ProfitWi$e Platform
+Deduplicated, optionally compressed business and chat snapshots with tiered retention and restore
+"""
+
+import os
+import re
+import gzip
+import hashlib
+import argparse
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+import serializer
+from storage import DataStore
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATTERN = re.compile(r'^businesses-(\d{8}_\d{6})-([0-9a-f]{12})\.json(\.gz)?$')
+
+
+class SnapshotManager:
+    """Take, prune and restore point-in-time copies of the business store"""
+
+    def __init__(self, store: DataStore, directory: str = 'snapshots', compress: bool = True,
+                 hourly_for: timedelta = timedelta(days=1), daily_for: timedelta = timedelta(days=30)):
+        self.store = store
+        self.directory = directory
+        self.compress = compress
+        self.hourly_for = hourly_for
+        self.daily_for = daily_for
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """List snapshots on disk, newest first"""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            match = SNAPSHOT_PATTERN.match(name)
+            if not match:
+                continue
+            snapshots.append({
+                'name': name,
+                'path': os.path.join(self.directory, name),
+                'taken_at': datetime.strptime(match.group(1), "%Y%m%d_%H%M%S"),
+                'hash': match.group(2),
+                'compressed': bool(match.group(3))
+            })
+        return sorted(snapshots, key=lambda s: s['taken_at'], reverse=True)
+
+    def take_snapshot(self) -> Optional[str]:
+        """Write a snapshot unless the newest one already holds identical content
+
+        Each business carries its whole chat log as chat_history, the way records held it
+        before the log moved to chat_messages, so old and new snapshots restore alike.
+        """
+        businesses = list(self.store.iter_businesses(chat_history=True))
+        for business in businesses:
+            business.setdefault('chat_history', [])
+        payload = serializer.dumps_bytes(businesses, sort_keys=True)
+        content_hash = hashlib.sha256(payload).hexdigest()[:12]
+
+        # Compare with the newest only: after A -> B -> A the newest snapshot must be A again,
+        # or restore() would default to B and retention could prune the only older copy of A
+        snapshots = self.list_snapshots()
+        if snapshots and snapshots[0]['hash'] == content_hash:
+            return None
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = f"businesses-{timestamp}-{content_hash}.json" + (".gz" if self.compress else "")
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.tmp"
+        if self.compress:
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(payload)
+        else:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Snapshot created: {name}")
+        return name
+
+    def prune(self, now: datetime = None) -> List[str]:
+        """Delete snapshots outside the retention policy and return their names"""
+        now = now or datetime.now()
+        kept_buckets = set()
+        removed = []
+
+        for index, snapshot in enumerate(self.list_snapshots()):
+            age = now - snapshot['taken_at']
+            if age <= self.hourly_for:
+                bucket = ('hour', snapshot['taken_at'].strftime("%Y%m%d%H"))
+            elif age <= self.daily_for:
+                bucket = ('day', snapshot['taken_at'].strftime("%Y%m%d"))
+            else:
+                bucket = None
+
+            # Always keep the newest snapshot, otherwise the newest per bucket
+            if index == 0 or (bucket is not None and bucket not in kept_buckets):
+                kept_buckets.add(bucket)
+                continue
+
+            os.remove(snapshot['path'])
+            removed.append(snapshot['name'])
+
+        if removed:
+            logger.info(f"Pruned {len(removed)} snapshots")
+        return removed
+
+    def read_snapshot(self, name: str) -> List[Dict]:
+        """Load the businesses, with their chat history, stored in a snapshot"""
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            return serializer.loads(f.read())
+
+    def restore(self, name: str = None) -> int:
+        """Replace the business store and chat logs with a snapshot, defaulting to the newest
+
+        A business saved without a chat_history key keeps its current chat log.
+        """
+        if name is None:
+            snapshots = self.list_snapshots()
+            if not snapshots:
+                raise FileNotFoundError(f"No snapshots in {self.directory}")
+            name = snapshots[0]['name']
+
+        businesses = self.read_snapshot(name)
+        # Keep the current state recoverable before overwriting it
+        self.take_snapshot()
+        self.store.save_businesses(businesses, chat_history=True)
+        logger.info(f"Restored {len(businesses)} businesses from {name}")
+        return len(businesses)
+
+    def run_once(self) -> None:
+        """Take a snapshot and apply retention"""
+        self.take_snapshot()
+        self.prune()
+
+    def start(self, interval: float = 3600.0) -> None:
+        """Snapshot and prune periodically on a daemon thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Snapshot run failed: {e}")
+                time.sleep(interval)
+
+        self._thread = threading.Thread(target=run, name='snapshot-manager', daemon=True)
+        self._thread.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProfitWi$e business snapshots")
+    parser.add_argument('--db', default=os.environ.get('DATABASE_FILE', 'profitwise.db'))
+    parser.add_argument('--dir', default=os.environ.get('SNAPSHOT_DIR', 'snapshots'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help="List snapshots, newest first")
+    create = subparsers.add_parser('create', help="Take a snapshot now")
+    create.add_argument('--no-compress', action='store_true')
+    subparsers.add_parser('prune', help="Apply the retention policy")
+    restore = subparsers.add_parser('restore', help="Restore the business store from a snapshot")
+    restore.add_argument('name', nargs='?', help="Snapshot file name (defaults to the newest)")
+
+    args = parser.parse_args()
+    manager = SnapshotManager(DataStore(args.db), args.dir,
+                              compress=not getattr(args, 'no_compress', False))
+
+    if args.command == 'list':
+        for snapshot in manager.list_snapshots():
+            print(f"{snapshot['name']}  {snapshot['taken_at'].isoformat()}")
+    elif args.command == 'create':
+        name = manager.take_snapshot()
+        print(f"Snapshot created: {name}" if name else "No changes since the last snapshot")
+    elif args.command == 'prune':
+        removed = manager.prune()
+        print(f"Removed {len(removed)} snapshots")
+    elif args.command == 'restore':
+        count = manager.restore(args.name)
+        print(f"Restored {count} businesses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1239 @@
+"""
+Storage Layer for ProfitWi$e Platform
+SQLite-backed store for users and businesses with indexed lookups and a one-shot JSON migrator
+"""
+
+import os
+import hashlib
+import sqlite3
+import argparse
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Tuple, Iterator
+
+import serializer
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    email TEXT,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+
+CREATE TABLE IF NOT EXISTS businesses (
+    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER,
+    user_id INTEGER UNIQUE,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_businesses_id ON businesses(id);
+
+CREATE TABLE IF NOT EXISTS business_sections (
+    user_id INTEGER NOT NULL,
+    section TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, section)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS dashboard_views (
+    user_id INTEGER NOT NULL UNIQUE,
+    formula_version INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    built_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user ON chat_messages(user_id, id);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_active ON chat_messages(user_id, id) WHERE archived = 0;
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email_key TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS metric_series (
+    user_id INTEGER NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (user_id, resolution, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_metric_series_bucket ON metric_series(resolution, bucket);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+USER_UPSERT = (
+    "INSERT INTO users (id, email, email_key, data) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(id) DO UPDATE SET email = excluded.email, email_key = excluded.email_key, "
+    "data = excluded.data, version = version + 1"
+)
+
+BUSINESS_UPSERT = (
+    "INSERT INTO businesses (id, user_id, data) VALUES (?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET id = excluded.id, data = excluded.data, version = version + 1"
+)
+
+# Large business fields kept in business_sections and only parsed when asked for
+HEAVY_SECTIONS = ('scraped_data', 'ai_analysis', 'extracted_data', 'reports', 'alerts')
+
+# Chat messages beyond the newest CHAT_ACTIVE_LIMIT per user are archived rather than deleted
+CHAT_ACTIVE_LIMIT = 100
+
+# Let SQLite read pages straight from a memory map instead of copying them through read()
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+# Periodic checkpoints only truncate the write-ahead log once it is larger than this
+WAL_TRUNCATE_BYTES = 64 * 1024 * 1024
+
+# Seconds a blocking checkpoint waits for readers before giving up until the next run
+CHECKPOINT_BUSY_TIMEOUT = 0.1
+
+# Tables whose data column holds an encoded record
+RECORD_TABLES = ('users', 'businesses', 'business_sections', 'dashboard_views', 'chat_messages', 'waitlist')
+
+SECTION_UPSERT = (
+    "INSERT INTO business_sections (user_id, section, data) VALUES (?, ?, ?) "
+    "ON CONFLICT(user_id, section) DO UPDATE SET data = excluded.data"
+)
+
+# Messages already in a user's chat log are skipped
+CHAT_INSERT = (
+    "INSERT INTO chat_messages (user_id, message_key, data) VALUES (?, ?, ?) "
+    "ON CONFLICT(user_id, message_key) DO NOTHING"
+)
+
+USER_SORT_COLUMNS = {
+    'id': "u.id",
+    'email': "u.email",
+    'name': "json_extract(u.data, '$.name')",
+    'created_at': "json_extract(u.data, '$.created_at')",
+    'last_login': "json_extract(u.data, '$.last_login')",
+    'category': "b.category",
+    'data_completeness': "b.data_completeness"
+}
+
+# Users fields sorted through an expression index; must match USER_SORT_COLUMNS exactly
+USER_SORT_INDEXES = ('name', 'created_at', 'last_login')
+
+# Sort keys on the business side of the join; users without a business sort as NULL
+BUSINESS_SORT_FIELDS = ('category', 'data_completeness')
+
+USER_SUMMARY_QUERY = """
+    SELECT u.data AS data, b.pk AS business_pk,
+           json_extract(b.data, '$.business_name') AS business_name,
+           b.category AS category,
+           json_extract(b.data, '$.website_url') AS website_url,
+           b.data_completeness AS data_completeness,
+           json_extract(b.data, '$.onboarding_completed_at') AS onboarding_completed_at,
+           json_extract(b.data, '$.financial_data') AS financial_data,
+           COALESCE(json_array_length(b.data, '$.files'), 0) AS files_count
+    FROM users u LEFT JOIN businesses b ON b.user_id = u.id
+"""
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised when a record keeps changing underneath an optimistic update"""
+
+
+class DuplicateEmailError(Exception):
+    """Raised when a user would share an email address with another user"""
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Case- and whitespace-normalize an email address for lookups"""
+    return email.strip().lower() if email else None
+
+
+def chat_message_key(message: Dict) -> str:
+    """Identify a chat message by its id, or by role, timestamp and content when it has none"""
+    if message.get('id') is not None:
+        return f"id:{message['id']}"
+    identity = serializer.dumps([message.get('role'), message.get('timestamp'), message.get('content')])
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+def _split_sections(business: Dict) -> Tuple[Dict, Dict]:
+    """Separate heavy sections from the core business record
+
+    Sections set to None stay in the core record, so business_sections only holds values.
+    """
+    core = {k: v for k, v in business.items() if k not in HEAVY_SECTIONS or v is None}
+    sections = {k: v for k, v in business.items() if k in HEAVY_SECTIONS and v is not None}
+    return core, sections
+
+
+def _business_data_sql(sections: Tuple[str, ...]) -> Tuple[str, List[str]]:
+    """SQL select list (and parameters) for a business record and a JSON object of the given sections
+
+    The two columns are combined by DataStore._decode_business. Merging in SQL with json_patch
+    would apply merge-patch rules and drop any null nested inside a section.
+    """
+    if not sections:
+        return "b.data AS data, NULL AS sections", []
+    placeholders = ", ".join("?" for _ in sections)
+    return (
+        "b.data AS data, (SELECT json_group_object(s.section, json(s.data)) FROM business_sections s "
+        f"WHERE s.user_id = b.user_id AND s.section IN ({placeholders})) AS sections",
+        list(sections)
+    )
+
+
+def _clone(value: Any) -> Any:
+    """Copy a JSON-shaped value so callers never share mutable state with the cache"""
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+class ReadThroughCache:
+    """Process-local cache of parsed records, revalidated against a table version"""
+
+    _MISSING = object()
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, version: int, loader: Callable[[], Any]) -> Any:
+        """Return a private copy of the cached value, loading it when stale"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            value = self._entries.get(key, self._MISSING)
+            if value is not self._MISSING:
+                self.hits += 1
+                return _clone(value)
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            # Only keep the value if no newer version was seen while loading
+            if version == self._version:
+                self._entries[key] = value
+        return _clone(value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for monitoring"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+            "version": self._version
+        }
+
+
+class DataStore:
+    """Indexed storage for user and business records"""
+
+    def __init__(self, db_path: str, mmap_size: int = DEFAULT_MMAP_SIZE):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._checkpointer = None
+        self.user_cache = ReadThroughCache('users')
+        self.business_cache = ReadThroughCache('businesses')
+        with self._connect() as conn:
+            # Commits append to the write-ahead log instead of rewriting the database file
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._upgrade_schema(conn)
+
+    @staticmethod
+    def _upgrade_schema(conn: sqlite3.Connection) -> None:
+        """Add columns introduced after a database was first created"""
+        for table in ('users', 'businesses'):
+            columns = {row['name'] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+            if 'version' not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+        # Chat messages are stored once per key, so replayed saves cannot repeat them
+        columns = {row['name'] for row in conn.execute("PRAGMA table_xinfo(chat_messages)")}
+        if 'message_key' not in columns:
+            conn.execute("ALTER TABLE chat_messages ADD COLUMN message_key TEXT")
+            seen, keys, repeats = set(), [], []
+            for row in conn.execute("SELECT id, user_id, data FROM chat_messages ORDER BY id"):
+                key = (row['user_id'], chat_message_key(serializer.loads(row['data'])))
+                if key in seen:
+                    repeats.append((row['id'],))
+                else:
+                    seen.add(key)
+                    keys.append((key[1], row['id']))
+            conn.executemany("UPDATE chat_messages SET message_key = ? WHERE id = ?", keys)
+            conn.executemany("DELETE FROM chat_messages WHERE id = ?", repeats)
+            if repeats:
+                logger.info(f"Removed {len(repeats)} repeated chat messages")
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_messages_key ON chat_messages(user_id, message_key)"
+        )
+
+        # Move chat histories kept on the business record into the chat log
+        histories = conn.execute(
+            "SELECT user_id, data FROM business_sections WHERE section = 'chat_history' "
+            "UNION ALL SELECT user_id, json_extract(data, '$.chat_history') FROM businesses "
+            "WHERE json_extract(data, '$.chat_history') IS NOT NULL"
+        ).fetchall()
+        for row in histories:
+            conn.executemany(
+                CHAT_INSERT,
+                [(row['user_id'], chat_message_key(message), serializer.dumps(message))
+                 for message in serializer.loads(row['data'])]
+            )
+        if histories:
+            conn.execute("DELETE FROM business_sections WHERE section = 'chat_history'")
+            conn.execute(
+                "UPDATE businesses SET data = json_remove(data, '$.chat_history') "
+                "WHERE json_extract(data, '$.chat_history') IS NOT NULL"
+            )
+            logger.info(f"Moved {len(histories)} chat histories into chat_messages")
+
+        # Move heavy sections out of records written before business_sections existed
+        legacy = conn.execute(
+            "SELECT user_id, data FROM businesses WHERE " +
+            " OR ".join(f"json_extract(data, '$.{name}') IS NOT NULL" for name in HEAVY_SECTIONS)
+        ).fetchall()
+        for row in legacy:
+            core, sections = _split_sections(serializer.loads(row['data']))
+            conn.execute(
+                "UPDATE businesses SET data = ? WHERE user_id = ?", (serializer.dumps(core), row['user_id'])
+            )
+            conn.executemany(
+                SECTION_UPSERT, [(row['user_id'], k, serializer.dumps(v)) for k, v in sections.items()]
+            )
+        if legacy:
+            logger.info(f"Moved heavy sections of {len(legacy)} businesses into business_sections")
+
+        # Normalized email key for O(1) login and duplicate checks
+        columns = {row['name'] for row in conn.execute("PRAGMA table_xinfo(users)")}
+        if 'email_key' not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN email_key TEXT")
+            conn.executemany(
+                "UPDATE users SET email_key = ? WHERE id = ?",
+                [(normalize_email(row['email']), row['id']) for row in conn.execute("SELECT id, email FROM users")]
+            )
+        try:
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_key ON users(email_key)")
+        except sqlite3.IntegrityError:
+            # Legacy data can hold the same address twice; keep the lookup fast
+            # and leave the duplicates for an admin to resolve
+            logger.warning("Duplicate user emails found; email index created without a unique constraint")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email_key_dup ON users(email_key)")
+
+        # Virtual columns over the record JSON so admin filters can use an index
+        columns = {row['name'] for row in conn.execute("PRAGMA table_xinfo(businesses)")}
+        if 'category' not in columns:
+            conn.execute(
+                "ALTER TABLE businesses ADD COLUMN category TEXT "
+                "GENERATED ALWAYS AS (json_extract(data, '$.category')) VIRTUAL"
+            )
+        if 'data_completeness' not in columns:
+            conn.execute(
+                "ALTER TABLE businesses ADD COLUMN data_completeness REAL "
+                "GENERATED ALWAYS AS (COALESCE(json_extract(data, '$.data_completeness'), 0)) VIRTUAL"
+            )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_businesses_category "
+            "ON businesses(category, data_completeness)"
+        )
+
+        # Sort indexes for the admin listing; user_id breaks ties in the same order as u.id
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_businesses_category_user "
+            "ON businesses(category, user_id)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_businesses_completeness "
+            "ON businesses(data_completeness, user_id)"
+        )
+        for field in USER_SORT_INDEXES:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_users_{field} "
+                f"ON users(json_extract(data, '$.{field}'))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # fsync the log on every commit, and leave folding it into the
+            # database to the background checkpointer rather than the request path
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("PRAGMA wal_autocheckpoint=0")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write_transaction(self):
+        """Take the database write lock up front so read-then-write steps cannot interleave"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def _patch(self, conn: sqlite3.Connection, table: str, key_column: str,
+               key: Any, fields: Dict) -> Optional[Dict]:
+        """Set top-level fields of one record in place and return the updated record"""
+        assignments = ", ".join("?, json(?)" for _ in fields)
+        params = []
+        for field, value in fields.items():
+            params.extend([f'$."{field}"', self._encode(value)])
+        row = conn.execute(
+            f"UPDATE {table} SET data = json_set(data, {assignments}), version = version + 1 "
+            f"WHERE {key_column} = ? RETURNING data",
+            (*params, key)
+        ).fetchone()
+        return self._decode(row)
+
+    def checkpoint(self, mode: str = 'TRUNCATE') -> Dict[str, int]:
+        """Fold the write-ahead log into the database file
+
+        PASSIVE copies what it can without waiting on anyone. TRUNCATE also empties the log
+        file, but new writers queue behind it while it waits for readers, so it runs on its
+        own connection and gives up after CHECKPOINT_BUSY_TIMEOUT rather than stalling requests.
+        """
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Unknown checkpoint mode: {mode}; expected one of {', '.join(CHECKPOINT_MODES)}")
+        wal_file = f"{self.db_path}-wal"
+        wal_bytes = os.path.getsize(wal_file) if os.path.exists(wal_file) else 0
+        conn = sqlite3.connect(self.db_path, timeout=CHECKPOINT_BUSY_TIMEOUT)
+        try:
+            busy = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()[0]
+        finally:
+            conn.close()
+        return {'busy': bool(busy), 'wal_bytes': wal_bytes}
+
+    def start_checkpointer(self, interval: float = 30.0, truncate_bytes: int = WAL_TRUNCATE_BYTES) -> None:
+        """Start a daemon thread that checkpoints the write-ahead log periodically
+
+        Routine checkpoints are PASSIVE so long-running readers such as a streamed export
+        never hold up writers; the log is only truncated once it grows past truncate_bytes.
+        """
+        if self._checkpointer is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    result = self.checkpoint('PASSIVE')
+                    if result['wal_bytes'] > truncate_bytes:
+                        result = self.checkpoint('TRUNCATE')
+                        if result['busy']:
+                            logger.info(f"WAL truncation deferred; {result['wal_bytes']} bytes still in use by readers")
+                except sqlite3.Error as e:
+                    logger.warning(f"WAL checkpoint failed: {e}")
+
+        self._checkpointer = threading.Thread(target=run, name='wal-checkpointer', daemon=True)
+        self._checkpointer.start()
+
+    @staticmethod
+    def _encode(record: Dict) -> str:
+        # Compact output; use dump_to_json for an indented copy to read
+        return serializer.dumps(record)
+
+    @staticmethod
+    def _decode(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        return serializer.loads(row['data']) if row is not None else None
+
+    @staticmethod
+    def _decode_business(row: Optional[Any]) -> Optional[Dict]:
+        """Decode a (data, sections) row selected with _business_data_sql"""
+        if row is None:
+            return None
+        business = serializer.loads(row[0])
+        if row[1]:
+            business.update(serializer.loads(row[1]))
+        return business
+
+    @classmethod
+    def _user_row(cls, user: Dict) -> Tuple:
+        """Column values for a user row in USER_UPSERT order"""
+        return (user.get('id'), user.get('email'), normalize_email(user.get('email')), cls._encode(user))
+
+    @classmethod
+    def _user_rows(cls, users: List[Dict]) -> List[Tuple]:
+        """Rows for a bulk user write, indexing only the first user per email as lookups always did"""
+        rows = []
+        seen_keys = set()
+        for user in users:
+            row = cls._user_row(user)
+            if row[2] is not None and row[2] in seen_keys:
+                logger.warning(f"User {user.get('id')} shares email {user.get('email')} with an earlier user")
+                row = (row[0], row[1], None, row[3])
+            seen_keys.add(row[2])
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection, table: str) -> None:
+        """Advance a table's version inside the writing transaction"""
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1",
+            (f"version:{table}",)
+        )
+
+    def get_version(self, table: str) -> int:
+        """Get a table's version; it changes whenever any process writes the table"""
+        row = self._connect().execute(
+            "SELECT value FROM meta WHERE key = ?", (f"version:{table}",)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get read-through cache counters for users and businesses"""
+        return {
+            'users': self.user_cache.stats(),
+            'businesses': self.business_cache.stats()
+        }
+
+    def is_empty(self) -> bool:
+        """Check whether the store holds no users and no businesses"""
+        conn = self._connect()
+        has_users = conn.execute("SELECT 1 FROM users LIMIT 1").fetchone()
+        has_businesses = conn.execute("SELECT 1 FROM businesses LIMIT 1").fetchone()
+        return not has_users and not has_businesses
+
+    # Users
+
+    def load_users(self) -> List[Dict]:
+        """Load all users ordered by id"""
+        def loader():
+            rows = self._connect().execute("SELECT data FROM users ORDER BY id")
+            return [self._decode(row) for row in rows]
+        return self.user_cache.get(('all',), self.get_version('users'), loader)
+
+    def save_users(self, users: List[Dict]) -> None:
+        """Replace all users with the given list"""
+        with self._write_transaction() as conn:
+            ids = [u.get('id') for u in users]
+            conn.execute(
+                f"DELETE FROM users WHERE id NOT IN ({', '.join('?' for _ in ids)})", ids
+            )
+            conn.executemany(USER_UPSERT, self._user_rows(users))
+            self._bump_version(conn, 'users')
+
+    def get_user(self, user_id: Any) -> Optional[Dict]:
+        """Get a user by id"""
+        def loader():
+            row = self._connect().execute("SELECT data FROM users WHERE id = ?", (user_id,)).fetchone()
+            return self._decode(row)
+        return self.user_cache.get(('id', user_id), self.get_version('users'), loader)
+
+    def get_user_by_email(self, email: str) -> Optional[Dict]:
+        """Get a user by email address, ignoring case and surrounding whitespace"""
+        email_key = normalize_email(email)
+        if email_key is None:
+            return None
+
+        def loader():
+            row = self._connect().execute(
+                "SELECT data FROM users WHERE email_key = ? ORDER BY id LIMIT 1", (email_key,)
+            ).fetchone()
+            return self._decode(row)
+        return self.user_cache.get(('email', email_key), self.get_version('users'), loader)
+
+    def upsert_user(self, user: Dict) -> None:
+        """Insert or replace a single user"""
+        with self._connect() as conn:
+            conn.execute(USER_UPSERT, self._user_row(user))
+            self._bump_version(conn, 'users')
+
+    def create_user(self, user: Dict) -> Dict:
+        """Insert a new user, allocating its id atomically, and return it"""
+        with self._write_transaction() as conn:
+            email_key = normalize_email(user.get('email'))
+            if email_key is not None and conn.execute(
+                "SELECT 1 FROM users WHERE email_key = ?", (email_key,)
+            ).fetchone():
+                raise DuplicateEmailError(f"An account with email {user.get('email')} already exists")
+            user = dict(user, id=conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users").fetchone()[0])
+            conn.execute(
+                "INSERT INTO users (id, email, email_key, data) VALUES (?, ?, ?, ?)",
+                self._user_row(user)
+            )
+            self._bump_version(conn, 'users')
+        return user
+
+    def update_user(self, user_id: Any, fields: Dict) -> Optional[Dict]:
+        """Merge fields into a user record and return the updated record"""
+        if not fields:
+            return self.get_user(user_id)
+        with self._connect() as conn:
+            user = self._patch(conn, 'users', 'id', user_id, fields)
+            if user is None:
+                return None
+            if 'email' in fields:
+                conn.execute(
+                    "UPDATE users SET email = ?, email_key = ? WHERE id = ?",
+                    (user.get('email'), normalize_email(user.get('email')), user_id)
+                )
+            self._bump_version(conn, 'users')
+        return user
+
+    # Businesses
+
+    def _write_business(self, conn: sqlite3.Connection, business: Dict) -> None:
+        """Insert or replace a full business record, including its sections
+
+        Chat history is not part of the record; it lives in the append-only chat log.
+        """
+        core, sections = _split_sections(business)
+        core.pop('chat_history', None)
+        conn.execute(BUSINESS_UPSERT, (core.get('id'), core.get('user_id'), self._encode(core)))
+        conn.execute("DELETE FROM business_sections WHERE user_id = ?", (core.get('user_id'),))
+        conn.executemany(
+            SECTION_UPSERT, [(core.get('user_id'), k, self._encode(v)) for k, v in sections.items()]
+        )
+
+    def load_businesses(self) -> List[Dict]:
+        """Load all businesses with their sections in insertion order"""
+        def loader():
+            expression, params = _business_data_sql(HEAVY_SECTIONS)
+            rows = self._connect().execute(f"SELECT {expression} FROM businesses b ORDER BY b.pk", params)
+            return [self._decode_business(row) for row in rows]
+        return self.business_cache.get(('all',), self.get_version('businesses'), loader)
+
+    def save_businesses(self, businesses: List[Dict], chat_history: bool = False) -> None:
+        """Replace all businesses with the given list
+
+        With chat_history=True, a business that carries a chat_history also has its
+        chat log replaced by it, as iter_businesses(chat_history=True) produced it.
+        """
+        with self._write_transaction() as conn:
+            user_ids = [b.get('user_id') for b in businesses]
+            placeholders = ', '.join('?' for _ in user_ids)
+            conn.execute(f"DELETE FROM businesses WHERE user_id NOT IN ({placeholders})", user_ids)
+            conn.execute(f"DELETE FROM business_sections WHERE user_id NOT IN ({placeholders})", user_ids)
+            # Any business may have changed, so every dashboard view is rebuilt on next read
+            conn.execute("DELETE FROM dashboard_views")
+            for business in businesses:
+                self._write_business(conn, business)
+                if chat_history and 'chat_history' in business:
+                    user_id = business.get('user_id')
+                    conn.execute("DELETE FROM chat_messages WHERE user_id = ?", (user_id,))
+                    conn.executemany(
+                        CHAT_INSERT,
+                        [(user_id, chat_message_key(m), self._encode(m)) for m in business['chat_history'] or []]
+                    )
+                    self._archive_chat(conn, user_id, CHAT_ACTIVE_LIMIT)
+            self._bump_version(conn, 'businesses')
+
+    def get_business_by_user(self, user_id: Any, sections: Tuple[str, ...] = HEAVY_SECTIONS) -> Optional[Dict]:
+        """Get the business owned by a user
+
+        Only the named heavy sections are loaded; pass sections=() for the core record.
+        """
+        sections = tuple(sections)
+
+        def loader():
+            expression, params = _business_data_sql(sections)
+            row = self._connect().execute(
+                f"SELECT {expression} FROM businesses b WHERE b.user_id = ?", (*params, user_id)
+            ).fetchone()
+            return self._decode_business(row)
+        return self.business_cache.get(('user_id', user_id, sections), self.get_version('businesses'), loader)
+
+    def get_business(self, business_id: Any) -> Optional[Dict]:
+        """Get a business with all its sections by its id"""
+        def loader():
+            expression, params = _business_data_sql(HEAVY_SECTIONS)
+            row = self._connect().execute(
+                f"SELECT {expression} FROM businesses b WHERE b.id = ? ORDER BY b.pk LIMIT 1",
+                (*params, business_id)
+            ).fetchone()
+            return self._decode_business(row)
+        return self.business_cache.get(('id', business_id), self.get_version('businesses'), loader)
+
+    def upsert_business(self, business: Dict) -> Dict:
+        """Insert or replace the business owned by business['user_id'] and return it
+
+        A business without an id is given the next free one inside the same transaction.
+        """
+        with self._write_transaction() as conn:
+            if business.get('id') is None:
+                next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM businesses").fetchone()[0]
+                business = dict(business, id=next_id)
+            self._write_business(conn, business)
+            conn.execute("DELETE FROM dashboard_views WHERE user_id = ?", (business.get('user_id'),))
+            self._bump_version(conn, 'businesses')
+        return business
+
+    def modify_business(self, user_id: Any, mutate: Callable[[Dict], None],
+                        retries: int = 5, sections: Tuple[str, ...] = HEAVY_SECTIONS) -> Optional[Dict]:
+        """Apply a read-modify-write to a user's business with optimistic concurrency
+
+        mutate() edits the record in place. If another writer changes the record
+        between the read and the write, the record is re-read and mutate() runs again.
+        Only the named heavy sections are loaded, and only sections that changed are written.
+        """
+        sections = tuple(sections)
+        expression, params = _business_data_sql(sections)
+        conn = self._connect()
+        for attempt in range(retries):
+            row = conn.execute(
+                f"SELECT {expression}, b.version AS version FROM businesses b WHERE b.user_id = ?",
+                (*params, user_id)
+            ).fetchone()
+            if row is None:
+                return None
+            business = self._decode_business(row)
+            original = {name: self._encode(business[name]) for name in sections if name in business}
+            mutate(business)
+            core, changed = _split_sections(business)
+            with conn:
+                updated = conn.execute(
+                    "UPDATE businesses SET id = ?, data = ?, version = version + 1 "
+                    "WHERE user_id = ? AND version = ?",
+                    (business.get('id'), self._encode(core), user_id, row['version'])
+                ).rowcount
+                if updated:
+                    conn.executemany(SECTION_UPSERT, [
+                        (user_id, name, encoded) for name, encoded in
+                        ((name, self._encode(value)) for name, value in changed.items())
+                        if original.get(name) != encoded
+                    ])
+                    removed = [name for name in HEAVY_SECTIONS
+                               if name not in changed and (name in original or name in core)]
+                    conn.executemany(
+                        "DELETE FROM business_sections WHERE user_id = ? AND section = ?",
+                        [(user_id, name) for name in removed]
+                    )
+                    self._bump_version(conn, 'businesses')
+                    return business
+            logger.info(f"Business for user {user_id} changed during update, retrying ({attempt + 1}/{retries})")
+        raise ConcurrentUpdateError(f"Business for user {user_id} was modified concurrently")
+
+    def update_business(self, user_id: Any, fields: Dict) -> Optional[Dict]:
+        """Merge fields into a user's business and return the core record with those fields"""
+        if not fields:
+            return self.get_business_by_user(user_id)
+        core_fields, section_fields = _split_sections(fields)
+        with self._connect() as conn:
+            if core_fields:
+                business = self._patch(conn, 'businesses', 'user_id', user_id, core_fields)
+            else:
+                business = self._decode(conn.execute(
+                    "UPDATE businesses SET version = version + 1 WHERE user_id = ? RETURNING data", (user_id,)
+                ).fetchone())
+            if business is None:
+                return None
+            if 'id' in fields:
+                conn.execute("UPDATE businesses SET id = ? WHERE user_id = ?", (business.get('id'), user_id))
+            # A section lives either in business_sections or as None in the core record
+            conn.executemany(
+                "DELETE FROM business_sections WHERE user_id = ? AND section = ?",
+                [(user_id, name) for name in core_fields if name in HEAVY_SECTIONS]
+            )
+            if section_fields:
+                conn.execute(
+                    f"UPDATE businesses SET data = json_remove(data, {', '.join('?' for _ in section_fields)}) "
+                    "WHERE user_id = ?",
+                    (*[f'$."{name}"' for name in section_fields], user_id)
+                )
+                conn.executemany(
+                    SECTION_UPSERT, [(user_id, k, self._encode(v)) for k, v in section_fields.items()]
+                )
+            self._bump_version(conn, 'businesses')
+        business.update(section_fields)
+        return business
+
+    def record_business_access(self, batch: List[Tuple[Any, int, str]]) -> None:
+        """Add buffered (user_id, access_count delta, last_access) entries in one transaction
+
+        Record versions still advance so optimistic writers see the change, but the table
+        version does not: counter-only updates would otherwise empty the read-through cache
+        every flush. Read current counters with get_business_access.
+        """
+        if not batch:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE businesses SET data = json_set(data, "
+                "'$.access_count', COALESCE(json_extract(data, '$.access_count'), 0) + ?, "
+                "'$.last_access', ?), version = version + 1 WHERE user_id = ?",
+                [(count, last_access, user_id) for user_id, count, last_access in batch]
+            )
+
+    def get_business_access(self, user_id: Any) -> Dict[str, Any]:
+        """Get the stored access_count/last_access of a user's business, bypassing the cache"""
+        row = self._connect().execute(
+            "SELECT json_extract(data, '$.access_count') AS access_count, "
+            "json_extract(data, '$.last_access') AS last_access FROM businesses WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+        if row is None:
+            return {}
+        return {key: row[key] for key in ('access_count', 'last_access') if row[key] is not None}
+
+    # Dashboard views
+
+    def get_dashboard_view_json(self, user_id: Any, formula_version: int) -> Optional[str]:
+        """Get a user's materialized dashboard payload as JSON text, if built with formula_version"""
+        row = self._connect().execute(
+            "SELECT data FROM dashboard_views WHERE user_id = ? AND formula_version = ?",
+            (user_id, formula_version)
+        ).fetchone()
+        return row['data'] if row is not None else None
+
+    def save_dashboard_view(self, user_id: Any, formula_version: int, view: Dict) -> str:
+        """Store a user's computed dashboard payload and return it as JSON text"""
+        data = serializer.dumps(view, sort_keys=True)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO dashboard_views (user_id, formula_version, data, built_at) "
+                "VALUES (?, ?, ?, datetime('now')) ON CONFLICT(user_id) DO UPDATE SET "
+                "formula_version = excluded.formula_version, data = excluded.data, built_at = excluded.built_at",
+                (user_id, formula_version, data)
+            )
+        return data
+
+    def clear_dashboard_views(self) -> int:
+        """Drop every materialized dashboard view and return how many were removed"""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM dashboard_views").rowcount
+
+    # Metric history
+
+    def fold_metric_series(self, keys: List[Tuple[Any, str, int]],
+                           fold: Callable[[Tuple[Any, str, int], Optional[bytes]], bytes]) -> None:
+        """Read-modify-write packed (user_id, resolution, bucket) series rows in one transaction
+
+        fold() receives each key and its current data, or None for a new bucket, and returns the new data.
+        """
+        if not keys:
+            return
+        with self._write_transaction() as conn:
+            for key in keys:
+                row = conn.execute(
+                    "SELECT data FROM metric_series WHERE user_id = ? AND resolution = ? AND bucket = ?", key
+                ).fetchone()
+                conn.execute(
+                    "INSERT INTO metric_series (user_id, resolution, bucket, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(user_id, resolution, bucket) DO UPDATE SET data = excluded.data",
+                    (*key, fold(key, row['data'] if row else None))
+                )
+
+    def get_metric_series(self, user_id: Any, resolution: str, since: int) -> List[Tuple[int, bytes]]:
+        """Get a user's (bucket, data) rows at one resolution from since onwards, oldest first"""
+        rows = self._connect().execute(
+            "SELECT bucket, data FROM metric_series WHERE user_id = ? AND resolution = ? AND bucket >= ? "
+            "ORDER BY bucket", (user_id, resolution, since)
+        )
+        return [(row['bucket'], row['data']) for row in rows]
+
+    def prune_metric_series(self, resolution: str, before: int) -> int:
+        """Delete every user's buckets at one resolution older than before"""
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM metric_series WHERE resolution = ? AND bucket < ?", (resolution, before)
+            ).rowcount
+
+    # Chat history
+
+    def append_chat_messages(self, user_id: Any, messages: List[Dict],
+                             keep_active: int = CHAT_ACTIVE_LIMIT) -> List[int]:
+        """Append messages to a user's chat log and archive all but the newest keep_active
+
+        Messages the log already holds (see chat_message_key) are skipped, so a client
+        may resend its whole history. Returns the ids of the messages actually added.
+        """
+        if not messages:
+            return []
+        with self._write_transaction() as conn:
+            ids = []
+            for message in messages:
+                row = conn.execute(
+                    f"{CHAT_INSERT} RETURNING id", (user_id, chat_message_key(message), self._encode(message))
+                ).fetchone()
+                if row is not None:
+                    ids.append(row['id'])
+            if ids:
+                self._archive_chat(conn, user_id, keep_active)
+        return ids
+
+    @staticmethod
+    def _archive_chat(conn: sqlite3.Connection, user_id: Any, keep_active: int) -> None:
+        # Archive everything older than the newest keep_active active messages
+        conn.execute(
+            "UPDATE chat_messages SET archived = 1 WHERE user_id = ? AND archived = 0 AND id <= ("
+            "SELECT id FROM chat_messages WHERE user_id = ? AND archived = 0 "
+            "ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (user_id, user_id, keep_active)
+        )
+
+    def get_chat_messages(self, user_id: Any, before: int = None, limit: int = 50,
+                          include_archived: bool = False) -> Tuple[List[Dict], Optional[int]]:
+        """Get one page of a user's chat, oldest first, ending just before the `before` cursor
+
+        Returns (messages, next_before); next_before is None once there are no older messages.
+        """
+        conditions = ["user_id = ?"]
+        params = [user_id]
+        if not include_archived:
+            conditions.append("archived = 0")
+        if before is not None:
+            conditions.append("id < ?")
+            params.append(before)
+        rows = self._connect().execute(
+            f"SELECT id, data, archived FROM chat_messages WHERE {' AND '.join(conditions)} "
+            "ORDER BY id DESC LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+
+        has_more = len(rows) > limit
+        messages = []
+        for row in reversed(rows[:limit]):
+            message = self._decode(row)
+            message['id'] = row['id']
+            if include_archived:
+                message['archived'] = bool(row['archived'])
+            messages.append(message)
+        return messages, (messages[0]['id'] if has_more else None)
+
+    def iter_chat_messages(self, user_id: Any, batch_size: int = 500) -> Iterator[Dict]:
+        """Yield a user's whole chat log, archived messages included, oldest first"""
+        return self._iter_rows(
+            "SELECT data FROM chat_messages WHERE user_id = ? ORDER BY id", batch_size, [user_id]
+        )
+
+    # Admin listing
+
+    def list_users_with_businesses(self, page: int = 1, page_size: int = 50, sort: str = 'id',
+                                   descending: bool = False, category: str = None,
+                                   min_completeness: float = None, max_completeness: float = None,
+                                   onboarding: str = None) -> Tuple[List[Dict], int]:
+        """Page through users joined to a summary of their business
+
+        The join goes through the unique user_id index, and the summary fields are
+        extracted in SQL so heavy sections such as scraped_data are never decoded.
+        Every sort key has an index, so a page is read in order instead of sorted.
+        Returns (rows, total) where each row is {'user': ..., 'business': summary or None}.
+        """
+        if sort not in USER_SORT_COLUMNS:
+            raise ValueError(f"Unknown sort field: {sort}")
+
+        conditions, params = [], []
+        if category:
+            conditions.append("b.category = ?")
+            params.append(category)
+        if min_completeness is not None:
+            conditions.append("b.data_completeness >= ?")
+            params.append(min_completeness)
+        if max_completeness is not None:
+            conditions.append("b.data_completeness <= ?")
+            params.append(max_completeness)
+        if onboarding == 'completed':
+            conditions.append("b.pk IS NOT NULL")
+        elif onboarding == 'pending':
+            conditions.append("b.pk IS NULL")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = self._connect()
+        if conditions:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM users u LEFT JOIN businesses b ON b.user_id = u.id {where}", params
+            ).fetchone()[0]
+        else:
+            total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+        direction = "DESC" if descending else "ASC"
+        sort_column = USER_SORT_COLUMNS[sort]
+        # (where, params, order, rows) for each run of the listing, in page order
+        segments = [(where, params, f"{sort_column} {direction}, u.id {direction}", total)]
+        if sort in BUSINESS_SORT_FIELDS and onboarding != 'pending':
+            # A LEFT JOIN cannot be read in the order of its right-hand side, so businesses
+            # are paged through their sort index and users without one, whose NULL key
+            # sorts first, are paged by id before them (after them when descending)
+            business_order = f"{sort_column} {direction}, b.user_id {direction}"
+            business_where = f"WHERE {' AND '.join(conditions + ['b.pk IS NOT NULL'])}"
+            if conditions:
+                segments = [(business_where, params, business_order, total)]
+            else:
+                with_business = conn.execute(
+                    "SELECT COUNT(*) FROM businesses b JOIN users u ON u.id = b.user_id"
+                ).fetchone()[0]
+                segments = [
+                    ("WHERE b.pk IS NULL", [], f"u.id {direction}", total - with_business),
+                    (business_where, [], business_order, with_business)
+                ]
+                if descending:
+                    segments.reverse()
+
+        rows, offset = [], (page - 1) * page_size
+        for segment_where, segment_params, order, count in segments:
+            if len(rows) == page_size:
+                break
+            if offset >= count:
+                offset -= count
+                continue
+            rows.extend(conn.execute(
+                f"{USER_SUMMARY_QUERY} {segment_where} ORDER BY {order} LIMIT ? OFFSET ?",
+                (*segment_params, page_size - len(rows), offset)
+            ).fetchall())
+            offset = 0
+
+        results = []
+        for row in rows:
+            business = None
+            if row['business_pk'] is not None:
+                business = {
+                    'business_name': row['business_name'],
+                    'category': row['category'],
+                    'website_url': row['website_url'],
+                    'data_completeness': row['data_completeness'],
+                    'onboarding_completed_at': row['onboarding_completed_at'],
+                    'financial_data': serializer.loads(row['financial_data']) if row['financial_data'] else {},
+                    'files_count': row['files_count']
+                }
+            results.append({'user': self._decode(row), 'business': business})
+        return results, total
+
+    # Streaming
+
+    def count(self, table: str) -> int:
+        """Count the rows in the users, businesses or waitlist table"""
+        if table not in ('users', 'businesses', 'waitlist'):
+            raise ValueError(f"Unknown table: {table}")
+        return self._connect().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def _iter_rows(self, query: str, batch_size: int, params: List = None, decode: bool = True) -> Iterator[Any]:
+        # A separate connection keeps the long-lived cursor away from request queries
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        try:
+            cursor = conn.execute(query, params or [])
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._decode(row) if decode else tuple(row)
+        finally:
+            conn.close()
+
+    def iter_users(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Yield users one at a time without materialising the whole table"""
+        return self._iter_rows("SELECT data FROM users ORDER BY id", batch_size)
+
+    def iter_businesses(self, batch_size: int = 500, sections: Tuple[str, ...] = HEAVY_SECTIONS,
+                        chat_history: bool = False) -> Iterator[Dict]:
+        """Yield businesses one at a time without materialising the whole table
+
+        With chat_history=True each business with a chat log carries it whole, oldest first,
+        as records did before the log moved to chat_messages.
+        """
+        expression, params = _business_data_sql(tuple(sections))
+        if chat_history:
+            expression += (
+                ", (SELECT json_group_array(json(c.data)) FROM "
+                "(SELECT data FROM chat_messages WHERE user_id = b.user_id ORDER BY id) c) AS chat_history"
+            )
+        rows = self._iter_rows(f"SELECT {expression} FROM businesses b ORDER BY b.pk", batch_size, params, decode=False)
+        for row in rows:
+            business = self._decode_business(row)
+            if chat_history and row[2] != '[]':
+                business['chat_history'] = serializer.loads(row[2])
+            yield business
+
+    def iter_onboarding_data(self, batch_size: int = 2000) -> Iterator[Tuple[Any, Optional[str], Dict]]:
+        """Yield (user_id, category, onboarding_data) per business without decoding the rest of the record"""
+        rows = self._iter_rows(
+            "SELECT b.user_id, b.category, json_extract(b.data, '$.onboarding_data') FROM businesses b ORDER BY b.pk",
+            batch_size, decode=False
+        )
+        for user_id, category, onboarding_data in rows:
+            yield user_id, category, serializer.loads(onboarding_data) if onboarding_data else {}
+
+    def iter_waitlist(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Yield waitlist entries in signup order"""
+        return self._iter_rows("SELECT data FROM waitlist ORDER BY id", batch_size)
+
+    # Waitlist
+
+    def load_waitlist(self) -> List[Dict]:
+        """Load all waitlist entries in signup order"""
+        rows = self._connect().execute("SELECT data FROM waitlist ORDER BY id")
+        return [self._decode(row) for row in rows]
+
+    def add_waitlist_entry(self, entry: Dict) -> Optional[Dict]:
+        """Append a waitlist entry with the next id, or return None if the email is already listed"""
+        email_key = normalize_email(entry.get('email'))
+        with self._write_transaction() as conn:
+            # Checked under the write lock so a rejected duplicate does not consume an id
+            if conn.execute("SELECT 1 FROM waitlist WHERE email_key = ?", (email_key,)).fetchone():
+                return None
+            row = conn.execute(
+                "INSERT INTO waitlist (email_key, data) VALUES (?, '{}') RETURNING id", (email_key,)
+            ).fetchone()
+            entry = dict(entry, id=row['id'])
+            conn.execute("UPDATE waitlist SET data = ? WHERE id = ?", (self._encode(entry), entry['id']))
+        return entry
+
+    def migrate_waitlist_from_json(self, entries_file: str) -> int:
+        """Import the legacy waitlist file, keeping entry ids and the first entry per email"""
+        entries = _read_json_list(entries_file)
+        with self._write_transaction() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM waitlist").fetchone()[0]
+            conn.executemany(
+                "INSERT OR IGNORE INTO waitlist (id, email_key, data) VALUES (?, ?, ?)",
+                [(e.get('id'), normalize_email(e.get('email')), self._encode(e)) for e in entries]
+            )
+            imported = conn.execute("SELECT COUNT(*) FROM waitlist").fetchone()[0] - before
+        logger.info(f"Migrated {imported} waitlist entries into {self.db_path}")
+        return imported
+
+    # Maintenance
+
+    def compact(self) -> Dict[str, int]:
+        """Re-encode every stored record compactly and reclaim the freed pages"""
+        wal_file = f"{self.db_path}-wal"
+        size_before = os.path.getsize(self.db_path) + (os.path.getsize(wal_file) if os.path.exists(wal_file) else 0)
+        with self._write_transaction() as conn:
+            for table in RECORD_TABLES:
+                # json() minifies in place without changing content, so versions are left alone
+                conn.execute(f"UPDATE {table} SET data = json(data) WHERE data != json(data)")
+        # In WAL mode VACUUM writes the rebuilt file into the log, so fold it back afterwards
+        self._connect().execute("VACUUM")
+        self.checkpoint()
+        return {'bytes_before': size_before, 'bytes_after': os.path.getsize(self.db_path)}
+
+    def dump_to_json(self, users_file: str, businesses_file: str, entries_file: str) -> Dict[str, int]:
+        """Write indented JSON copies of the store for debugging, readable by migrate_from_json"""
+        users = self.load_users()
+        businesses = self.load_businesses()
+        for business in businesses:
+            chat_history = list(self.iter_chat_messages(business.get('user_id')))
+            if chat_history:
+                business['chat_history'] = chat_history
+        entries = self.load_waitlist()
+        for path, records in ((users_file, users), (businesses_file, businesses), (entries_file, entries)):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(serializer.dumps_bytes(records, indent=True))
+            os.replace(tmp_path, path)
+        return {'users': len(users), 'businesses': len(businesses), 'entries': len(entries)}
+
+    # Migration
+
+    def migrate_from_json(self, users_file: str, businesses_file: str) -> Dict[str, int]:
+        """Import users and businesses from the legacy JSON files"""
+        users = _read_json_list(users_file)
+        businesses = _read_json_list(businesses_file)
+
+        # The JSON lookups took the first match per user, so keep the first record
+        seen_user_ids = set()
+        unique_businesses = []
+        for business in businesses:
+            if business.get('user_id') in seen_user_ids:
+                logger.warning(f"Skipping duplicate business for user {business.get('user_id')}")
+                continue
+            seen_user_ids.add(business.get('user_id'))
+            unique_businesses.append(business)
+
+        with self._write_transaction() as conn:
+            conn.executemany(USER_UPSERT, self._user_rows(users))
+            self._bump_version(conn, 'users')
+            for business in unique_businesses:
+                self._write_business(conn, business)
+                conn.executemany(
+                    CHAT_INSERT,
+                    [(business.get('user_id'), chat_message_key(m), self._encode(m))
+                     for m in business.get('chat_history') or []]
+                )
+            self._bump_version(conn, 'businesses')
+
+        logger.info(f"Migrated {len(users)} users and {len(unique_businesses)} businesses into {self.db_path}")
+        return {'users': len(users), 'businesses': len(unique_businesses)}
+
+
+def _read_json_list(path: str) -> List[Dict]:
+    """Read a JSON list from disk, treating a missing file as empty"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        return serializer.loads(f.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProfitWi$e storage tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help="Import users.json and businesses.json into the database")
+    migrate.add_argument('--db', default=os.environ.get('DATABASE_FILE', 'profitwise.db'))
+    migrate.add_argument('--users', default='users.json')
+    migrate.add_argument('--businesses', default='businesses.json')
+    migrate.add_argument('--entries', default='user_entries.json')
+
+    checkpoint = subparsers.add_parser('checkpoint', help="Fold the write-ahead log into the database file")
+    checkpoint.add_argument('--db', default=os.environ.get('DATABASE_FILE', 'profitwise.db'))
+    checkpoint.add_argument('--mode', default='TRUNCATE', choices=CHECKPOINT_MODES)
+
+    dump = subparsers.add_parser('dump', help="Write indented JSON copies of the database")
+    dump.add_argument('--db', default=os.environ.get('DATABASE_FILE', 'profitwise.db'))
+    dump.add_argument('--users', default='users.json')
+    dump.add_argument('--businesses', default='businesses.json')
+    dump.add_argument('--entries', default='user_entries.json')
+
+    compact = subparsers.add_parser('compact', help="Re-encode records compactly and vacuum the database")
+    compact.add_argument('--db', default=os.environ.get('DATABASE_FILE', 'profitwise.db'))
+
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        store = DataStore(args.db)
+        counts = store.migrate_from_json(args.users, args.businesses)
+        entries = store.migrate_waitlist_from_json(args.entries)
+        print(f"Migrated {counts['users']} users, {counts['businesses']} businesses "
+              f"and {entries} waitlist entries into {args.db}")
+    elif args.command == 'checkpoint':
+        result = DataStore(args.db).checkpoint(args.mode)
+        status = "incomplete, database busy" if result['busy'] else "complete"
+        print(f"Checkpointed {result['wal_bytes']} bytes of write-ahead log ({status})")
+    elif args.command == 'dump':
+        counts = DataStore(args.db).dump_to_json(args.users, args.businesses, args.entries)
+        print(f"Wrote {counts['users']} users, {counts['businesses']} businesses "
+              f"and {counts['entries']} waitlist entries")
+    elif args.command == 'compact':
+        result = DataStore(args.db).compact()
+        print(f"Compacted {args.db} from {result['bytes_before']} to {result['bytes_after']} bytes")
+
+
+if __name__ == "__main__":
+    main()